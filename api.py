@@ -2,8 +2,102 @@
 import logging
 import aiohttp
 import json
-from cache_manager import CacheManager
+import os
+from cache_manager import CacheManager, PersistentCache
+from reference_data import ReferenceData, REFERENCE_DATA_ENDPOINTS
+from price_snapshot import PriceSnapshot, PRICE_SNAPSHOT_ENDPOINT
+from rate_limiter import AdaptiveConcurrencyLimiter, TokenBucket
 import asyncio
+import contextvars
+import functools
+import importlib.util
+import itertools
+import random
+import statistics
+import time
+from collections import Counter, defaultdict, deque
+from enum import IntEnum
+from urllib.parse import urlencode
+
+try:
+    import orjson  # Optional, decodes the large price responses several times faster
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+# Cache TTLs (in seconds) for each endpoint: reference data follows the TTLs documented in api-docs,
+# prices are only kept for a few minutes
+ENDPOINT_CACHE_TTLS = {
+    "/commodities": 3600,
+    "/planets": 86400,
+    "/star_systems": 86400,
+    "/terminals": 43200,
+    "/commodities_prices": 300,
+    "/commodities_routes": 300,
+    # Only fetched when a snapshot is (re)loaded, then kept for offline searches
+    PRICE_SNAPSHOT_ENDPOINT: 86400
+}
+CACHE_SWEEP_INTERVAL = 60
+CACHE_FILE_NAME = "cache.db"
+# Transport: connections are kept alive between the many /commodities_prices calls of a search
+DNS_CACHE_TTL = 300
+KEEPALIVE_TIMEOUT = 60
+CONNECT_TIMEOUT = 10
+# The price snapshot is a single large download
+ENDPOINT_REQUEST_TIMEOUTS = {
+    PRICE_SNAPSHOT_ENDPOINT: 120
+}
+# Expired entries are still served (then revalidated) for this ratio of their TTL
+CACHE_STALE_RATIO = 1
+# Response headers sent back in conditional requests
+VALIDATOR_HEADERS = ("ETag", "Last-Modified")
+# Failed GETs are retried with a jittered exponential backoff (in seconds)
+RETRY_BACKOFF_BASE = 0.5
+RETRY_BACKOFF_MAX = 8
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+# Hedged requests: a duplicate request is sent when the first one is slower than the p95 latency of its endpoint
+LATENCY_SAMPLES = 100
+HEDGE_MIN_SAMPLES = 20
+# aiohttp only decodes brotli responses when one of these packages is installed
+ACCEPT_ENCODING = "gzip, deflate, br" if importlib.util.find_spec("brotli") or importlib.util.find_spec("brotlicffi") \
+    else "gzip, deflate"
+
+
+def make_cache_key(endpoint, params=None):
+    # Query strings are text anyway: sort the params and compare their values as strings,
+    # so that {'id': 1} and {'id': '1'} (or a different dict ordering) share the same entry
+    params = sorted((str(key), str(value)) for key, value in (params or {}).items() if value is not None)
+    return f"{endpoint}?{urlencode(params)}" if params else endpoint
+
+
+class RequestPriority(IntEnum):
+    INTERACTIVE = 0  # Lookups driven by the UI (combo boxes, trade tab)
+    SEARCH = 1  # Fan-out of the trade route searches
+    BACKGROUND = 2  # Pre-warming
+
+
+# Priority of the requests sent by the current task (and the tasks it starts), interactive unless stated otherwise
+request_priority = contextvars.ContextVar("request_priority", default=RequestPriority.INTERACTIVE)
+
+
+def with_request_priority(priority):
+    """Run a coroutine function with its API requests queued at `priority`."""
+    def decorator(function):
+        @functools.wraps(function)
+        async def wrapper(*args, **kwargs):
+            token = request_priority.set(priority)
+            try:
+                return await function(*args, **kwargs)
+            finally:
+                request_priority.reset(token)
+        return wrapper
+    return decorator
+
+
+def is_retryable_error(error):
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status in RETRYABLE_STATUSES
+    return isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError))
 
 
 class API:
@@ -16,25 +110,75 @@ class API:
             cls._instance = super(API, cls).__new__(cls)
         return cls._instance
 
-    def __init__(self, config_manager, cache_ttl=1800):
+    def __init__(self, config_manager, cache_ttl=1800, cache_file=None):
         if not hasattr(self, 'singleton'):  # Ensure __init__ is only called once
             self.config_manager = config_manager
-            self.cache = CacheManager(ttl=cache_ttl)
+            self.cache = CacheManager(ttl=cache_ttl, endpoint_ttls=ENDPOINT_CACHE_TTLS, stale_ratio=CACHE_STALE_RATIO)
+            # The cache file sits next to config.ini, whatever directory the application is started from
+            cache_file = cache_file or os.path.join(os.path.dirname(os.path.abspath(config_manager.config_file)),
+                                                    CACHE_FILE_NAME)
+            # Entries past the longest TTL and its stale window are never read again
+            self.persistent_cache = PersistentCache(
+                cache_file, max_age=max(cache_ttl, *ENDPOINT_CACHE_TTLS.values()) * (1 + CACHE_STALE_RATIO)
+            )
             self.session = None
+            self.cache_sweeper = None
+            self.in_flight_requests = {}
+            self.cache_hits = Counter()
+            self.cache_misses = Counter()
+            self.request_latencies = defaultdict(lambda: deque(maxlen=LATENCY_SAMPLES))
+            self.rate_limiter = None
+            self.concurrency_limiter = None
+            self.reference_data = None
+            self.reference_data_lock = asyncio.Lock()
+            self.price_snapshot = None
+            self.price_snapshot_lock = asyncio.Lock()
+            self.price_snapshot_listeners = []
             self.singleton = True
 
     async def initialize(self):
         async with self._lock:
             if self.session is None:
-                self.session = aiohttp.ClientSession()
+                self.session = self.create_session()
+                # Requests are throttled client-side, their concurrency adapting to what the server tolerates
+                self.rate_limiter = TokenBucket(self.config_manager.get_requests_per_second())
+                self.concurrency_limiter = AdaptiveConcurrencyLimiter(
+                    max_limit=self.config_manager.get_connections_per_host()
+                )
+                self.cache_sweeper = asyncio.ensure_future(self.sweep_cache())
                 self._initialized.set()
 
     async def cleanup(self):
+        self.get_logger().debug(f"Cache statistics: {self.get_cache_stats()}")
+        if self.cache_sweeper:
+            self.cache_sweeper.cancel()
+            self.cache_sweeper = None
         if self.session:
             await self.session.close()
             self.session = None
+        self.persistent_cache.flush()
         self._initialized.clear()
 
+    def create_session(self):
+        connector = aiohttp.TCPConnector(limit_per_host=self.config_manager.get_connections_per_host(),
+                                         ttl_dns_cache=DNS_CACHE_TTL,
+                                         keepalive_timeout=KEEPALIVE_TIMEOUT)
+        return aiohttp.ClientSession(connector=connector,
+                                     timeout=self.get_request_timeout(),
+                                     headers={"Accept-Encoding": ACCEPT_ENCODING})
+
+    def get_request_timeout(self, endpoint=None):
+        total = max(self.config_manager.get_request_timeout(), ENDPOINT_REQUEST_TIMEOUTS.get(endpoint, 0))
+        return aiohttp.ClientTimeout(total=total, sock_connect=CONNECT_TIMEOUT)
+
+    async def sweep_cache(self):
+        # Periodically drop expired entries that are never read again
+        while True:
+            await asyncio.sleep(CACHE_SWEEP_INTERVAL)
+            swept_entries = self.cache.sweep()
+            if swept_entries:
+                self.get_logger().debug(f"{swept_entries} expired cache entries swept")
+
     async def ensure_initialized(self):
         if not self._initialized.is_set():
             await self.initialize()
@@ -58,34 +202,217 @@ class API:
     def get_logger(self):
         return logging.getLogger(__name__)
 
-    async def fetch_data(self, endpoint, params=None):
+    def get_cache_ttl(self, endpoint):
+        return self.cache.get_ttl(endpoint)
+
+    def get_cache_stats(self):
+        stats = {}
+        for endpoint in sorted(set(self.cache_hits) | set(self.cache_misses)):
+            hits, misses = self.cache_hits[endpoint], self.cache_misses[endpoint]
+            stats[endpoint] = {"hits": hits, "misses": misses, "hit_rate": hits / (hits + misses)}
+        return stats
+
+    async def fetch_data(self, endpoint, params=None, refresh=False):
         await self.ensure_initialized()
-        cache_key = f"{endpoint}_{params}"
-        cached_data = self.cache.get(cache_key)
+        cache_key = make_cache_key(endpoint, params)
         logger = self.get_logger()
+        # Persisted entries are loaded even on refresh, their validators make the request conditional
+        cached_data = self.get_cached_data(endpoint, cache_key)
+        if not refresh:
+            if cached_data:
+                self.cache_hits[endpoint] += 1
+                return cached_data
+            # Stale-while-revalidate: an expired entry is served at once while it is refreshed in the background
+            stale_data = self.cache.get_stale(cache_key)
+            if stale_data:
+                logger.debug(f"Serving stale {cache_key} while revalidating it")
+                self.cache_hits[endpoint] += 1
+                self.start_request(endpoint, params, cache_key, revalidation=True)
+                return stale_data
+        # Coalesce identical concurrent requests onto a single in-flight one
+        request, started = self.start_request(endpoint, params, cache_key)
+        if started:
+            self.cache_misses[endpoint] += 1
+        else:
+            logger.debug(f"Joining in-flight request for {cache_key}")
+            self.cache_hits[endpoint] += 1
+        # Shielded so that a cancelled caller does not cancel the request for the other ones
+        return await asyncio.shield(request)
+
+    def get_cached_data(self, endpoint, cache_key):
+        cached_data = self.cache.get(cache_key)
         if cached_data:
-            logger.debug(f"Cache hit for {cache_key}")
+            self.get_logger().debug(f"Cache hit for {cache_key}")
             return cached_data
+        # Fresh and stale persisted entries are loaded in memory, only the fresh ones are returned
+        persisted_entry = None
+        if self.cache.get_stale(cache_key) is None:
+            persisted_entry = self.persistent_cache.get(cache_key, self.get_cache_ttl(endpoint) * (1 + CACHE_STALE_RATIO))
+        if persisted_entry:
+            persisted_data, timestamp = persisted_entry
+            self.cache.set(cache_key, persisted_data, timestamp, endpoint,
+                           validators=self.persistent_cache.get_validators(cache_key))
+            cached_data = self.cache.get(cache_key)
+            if cached_data:
+                self.get_logger().debug(f"Persistent cache hit for {cache_key}")
+        return cached_data
+
+    def start_request(self, endpoint, params, cache_key, revalidation=False):
+        """Return the request in flight for cache_key, starting it if needed, and whether it was started."""
+        request = self.in_flight_requests.get(cache_key)
+        if request is not None and not request.done():
+            return request, False
+        context = contextvars.copy_context()
+        if revalidation:
+            context.run(request_priority.set, RequestPriority.BACKGROUND)
+        request = asyncio.get_running_loop().create_task(self.request_data(endpoint, params, cache_key),
+                                                         context=context)
+        self.in_flight_requests[cache_key] = request
+        request.add_done_callback(lambda done_request: self.release_in_flight_request(cache_key, done_request))
+        return request, True
+
+    def release_in_flight_request(self, cache_key, request):
+        if self.in_flight_requests.get(cache_key) is request:
+            del self.in_flight_requests[cache_key]
+        if not request.cancelled() and request.exception():
+            # Nobody may be awaiting a background revalidation
+            self.get_logger().debug(f"Request for {cache_key} failed: {request.exception()!r}")
+
+    async def request_data(self, endpoint, params, cache_key):
+        # Entries still in cache are revalidated with a conditional request, answered by a 304 when unchanged
+        cached_data = self.cache.get_stale(cache_key)
+        validators = self.cache.get_validators(cache_key) if cached_data is not None else {}
+        # GETs are idempotent: transient failures (timeouts, connection errors, 429/5xx) are retried
+        max_retries = self.config_manager.get_max_retries()
+        for attempt in itertools.count():
+            try:
+                body, response_validators = await self.request_hedged(endpoint, params, validators)
+                break
+            except Exception as e:
+                if attempt >= max_retries or not is_retryable_error(e):
+                    raise
+                delay = random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * 2 ** attempt))
+                self.get_logger().warning(f"API request to {cache_key} failed ({e!r}), "
+                                          f"retry {attempt + 1}/{max_retries} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+        if body is None:
+            self.get_logger().debug(f"API Response: {cache_key} not modified")
+            self.cache.touch(cache_key)
+            self.persistent_cache.touch(cache_key, self.cache.get_timestamp(cache_key))
+            return cached_data
+        data = json_loads(body)
+        self.get_logger().debug(f"API Response: {data}")
+        self.cache.set(cache_key, data, endpoint=endpoint, size=len(body), validators=response_validators)
+        self.persistent_cache.set(cache_key, endpoint, data, self.cache.get_timestamp(cache_key), response_validators,
+                                  body=body)
+        return data
+
+    def get_hedge_delay(self, endpoint):
+        latencies = self.request_latencies[endpoint]
+        if not self.config_manager.get_hedge_requests() or len(latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        return statistics.quantiles(latencies, n=20)[-1]
+
+    async def request_hedged(self, endpoint, params, validators=None):
+        hedge_delay = self.get_hedge_delay(endpoint)
+        if hedge_delay is None:
+            return await self.send_request(endpoint, params, validators)
+        requests = [asyncio.ensure_future(self.send_request(endpoint, params, validators))]
+        done, _ = await asyncio.wait(requests, timeout=hedge_delay)
+        if not done:
+            self.get_logger().debug(f"Hedging request to {endpoint} after {hedge_delay:.2f}s")
+            requests.append(asyncio.ensure_future(self.send_request(endpoint, params, validators)))
+        try:
+            # The first successful response wins, a failure only counts once both requests failed
+            while True:
+                done, pending = await asyncio.wait(requests, return_when=asyncio.FIRST_COMPLETED)
+                successful_requests = [request for request in done if not request.cancelled() and request.exception() is None]
+                if successful_requests or not pending:
+                    return (successful_requests or list(done))[0].result()
+                requests = list(pending)
+        finally:
+            for request in requests:
+                request.cancel()
+
+    async def send_request(self, endpoint, params, validators=None):
+        """GET the endpoint, returning (body, validators), with a None body when the server answered 304."""
+        logger = self.get_logger()
         url = f"{await self.get_API_BASE_URL()}{endpoint}"
         logger.debug(f"API Request: GET {url} {params if params else ''}")
+        # Queued by priority for a concurrency slot, then for a token of the rate limiter
+        priority = request_priority.get()
+        async with self.concurrency_limiter.slot(priority):
+            await self.rate_limiter.acquire(priority)
+            return await self.send_limited_request(url, endpoint, params, validators)
+
+    async def send_limited_request(self, url, endpoint, params, validators=None):
+        logger = self.get_logger()
+        headers = {}
+        if validators and validators.get("ETag"):
+            headers["If-None-Match"] = validators["ETag"]
+        if validators and validators.get("Last-Modified"):
+            headers["If-Modified-Since"] = validators["Last-Modified"]
+        started_at = time.monotonic()
         try:
-            async with self.session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    logger.debug(f"API Response: {data}")
-                    self.cache.set(cache_key, data)
-                    return data
+            async with self.session.get(url, params=params, headers=headers,
+                                        timeout=self.get_request_timeout(endpoint)) as response:
+                if response.status in (200, 304):
+                    body = await response.read() if response.status == 200 else None
+                    latency = time.monotonic() - started_at
+                    self.request_latencies[endpoint].append(latency)
+                    self.concurrency_limiter.on_success(latency)
+                    return body, {header: response.headers[header] for header in VALIDATOR_HEADERS
+                                  if header in response.headers}
                 else:
                     error_message = await response.text()
                     logger.error(f"API request failed with status {response.status}: {error_message}")
                     response.raise_for_status()  # Raise an exception for bad status codes
         except aiohttp.ClientResponseError as e:
             logger.error(f"API request failed with status {e.status}: {e.message} - {e.request_info.url}")
+            if e.status in RETRYABLE_STATUSES:
+                self.concurrency_limiter.on_overload()
             raise  # Re-raise the exception to be handled by the calling function
+        except asyncio.TimeoutError:
+            logger.error(f"API request timed out: {url}")
+            self.concurrency_limiter.on_overload()
+            raise
         except aiohttp.ClientError as e:
             logger.error(f"API request failed: {e}")
             raise  # Re-raise the exception to be handled by the calling function
 
+    async def fetch_reference_data(self):
+        # Loaded once for all tabs, then reloaded when the first of its endpoints expires
+        async with self.reference_data_lock:
+            reference_data_ttl = min(self.get_cache_ttl(endpoint) for endpoint in REFERENCE_DATA_ENDPOINTS)
+            if self.reference_data is None or time.time() - self.reference_data.loaded_at >= reference_data_ttl:
+                responses = await asyncio.gather(*(self.fetch_data(endpoint) for endpoint in REFERENCE_DATA_ENDPOINTS))
+                self.reference_data = ReferenceData(*(response.get("data", []) for response in responses))
+            return self.reference_data
+
+    def add_price_snapshot_listener(self, listener):
+        self.price_snapshot_listeners.append(listener)
+
+    async def fetch_price_snapshot(self, refresh=False, max_age=None):
+        # All prices in a single call, kept (and persisted) until explicitly refreshed or older than max_age
+        async with self.price_snapshot_lock:
+            if (refresh or self.price_snapshot is None
+                    or (max_age is not None and self.price_snapshot.get_age() > max_age)):
+                refresh = refresh or self.price_snapshot is not None
+                cache_key = make_cache_key(PRICE_SNAPSHOT_ENDPOINT)
+                # Refreshes are conditional requests, an unchanged snapshot is not downloaded again
+                prices = (await self.fetch_data(PRICE_SNAPSHOT_ENDPOINT, refresh=refresh)).get("data", [])
+                if self.price_snapshot is None:
+                    self.price_snapshot = PriceSnapshot(prices, self.cache.get_timestamp(cache_key))
+                else:
+                    # Refreshes are merged in place and only the changed rows are reported to the listeners
+                    diff = self.price_snapshot.update(prices, self.cache.get_timestamp(cache_key))
+                    self.get_logger().info(f"Price snapshot refreshed: {len(diff.added)} added, "
+                                           f"{len(diff.updated)} updated, {len(diff.removed)} removed")
+                    if diff:
+                        for listener in self.price_snapshot_listeners:
+                            listener(diff)
+            return self.price_snapshot
+
     async def post_data(self, endpoint, data={}):
         await self.ensure_initialized()
         url = f"{await self.get_API_BASE_URL()}{endpoint}"
@@ -128,35 +455,26 @@ class API:
         return commodities.get("data", [])
 
     async def fetch_planets(self, system_id=None, planet_id=None):
-        params = {}
-        if system_id:
-            params = {'id_star_system': system_id}
-        planets = await self.fetch_data("/planets", params=params)
-        return [planet for planet in planets.get("data", [])
+        reference_data = await self.fetch_reference_data()
+        return [planet for planet in reference_data.get_planets(system_id)
                 if planet.get("is_available") == 1 and (not planet_id or planet.get("id") == planet_id)]
 
     async def fetch_terminals(self, system_id, planet_id=None, terminal_id=None):
-        params = {'id_star_system': system_id}
-        if planet_id:
-            params['id_planet'] = planet_id
-        terminals = await self.fetch_data("/terminals", params=params)
-        return [terminal for terminal in terminals.get("data", [])
+        reference_data = await self.fetch_reference_data()
+        return [terminal for terminal in reference_data.get_terminals(system_id, planet_id)
                 if terminal.get("type") == "commodity" and terminal.get("is_available") == 1
                 and (not terminal_id or terminal.get("id") == terminal_id)]
 
     async def fetch_systems_from_origin_system(self, origin_system_id, max_bounce=1):
-        params = {}
+        reference_data = await self.fetch_reference_data()
         # TODO - Return systems linked to origin_system_id with a maximum of "max_bounce" hops - API does not give this for now
-        systems = await self.fetch_data("/star_systems", params=params)
-        return [system for system in systems.get("data", [])
+        return [system for system in reference_data.get_systems()
                 if system.get("is_available") == 1]
 
     async def fetch_system(self, system_id):
-        params = {}
-        systems = await self.fetch_data("/star_systems", params=params)
-        return [system for system in systems.get("data", [])
-                if system.get("is_available") == 1
-                and system.get("id") == system_id]
+        reference_data = await self.fetch_reference_data()
+        system = reference_data.get_system(system_id)
+        return [system] if system and system.get("is_available") == 1 else []
 
     async def fetch_routes(self, id_planet_origin, id_planet_destination):
         params = {'id_planet_origin': id_planet_origin}
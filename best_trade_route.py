@@ -2,21 +2,34 @@ import logging
 import sys
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QLabel, QLineEdit, QComboBox,
-    QPushButton, QTableWidget, QMessageBox, QTableWidgetItem,
-    QHBoxLayout, QCheckBox, QApplication, QProgressBar
+    QPushButton, QMessageBox, QCheckBox, QApplication, QProgressBar
 )
-from PyQt5.QtCore import Qt
 import asyncio
-from api import API
+from api import API, RequestPriority, with_request_priority
 from config_manager import ConfigManager
 from trade_tab import TradeTab
 from translation_manager import TranslationManager
-from tools import create_async_callback
+from tools import gather_bounded
+from route_scoring import score_commodity_pairs, build_trade_route
+from route_ranking import RouteLeaderboard, route_sort_key
+from route_planner import find_trade_chains
+from route_workers import RouteWorkerPool
+from cargo_mix import optimize_cargo_mix
+from trade_route import TradeChain, CargoMix
+from route_engine import (
+    RouteSearchOptions, build_commodity_route_trade_route, fetch_filtered_terminals, find_trade_routes
+)
+from price_snapshot_mixin import PriceSnapshotMixin
+from trade_route_table import TradeRouteTableView
 
 
-class BestTradeRouteTab(QWidget):
+class BestTradeRouteTab(QWidget, PriceSnapshotMixin):
     _lock = asyncio.Lock()
     _initialized = asyncio.Event()
+    route_fields = [
+        "departure", "destination", "commodity", "buy_scu", "buy_price", "sell_price", "investment",
+        "unit_margin", "total_margin", "departure_scu_available", "arrival_demand_scu", "profit_margin"
+    ]
 
     def __init__(self, main_widget):
         super().__init__()
@@ -28,6 +41,8 @@ class BestTradeRouteTab(QWidget):
         self.logger = logging.getLogger(__name__)
         self.terminals = []
         self.current_trades = []
+        self.price_snapshot = None
+        self.search_options = None
         asyncio.ensure_future(self.load_systems())
 
     async def initialize(self):
@@ -167,6 +182,20 @@ class BestTradeRouteTab(QWidget):
         self.filter_space_only_checkbox = QCheckBox(self.translation_manager.get_translation("space_only",
                                                                                              self.config_manager.get_lang()))
         layout.addWidget(self.filter_space_only_checkbox)
+        self.add_price_snapshot_widgets(layout)
+
+        self.cargo_mix_checkbox = QCheckBox(self.translation_manager.get_translation("mix_commodities",
+                                                                                     self.config_manager.get_lang()))
+        layout.addWidget(self.cargo_mix_checkbox)
+        self.trade_legs_combo = QComboBox()
+        for nb_legs in range(1, 5):
+            self.trade_legs_combo.addItem(f"{nb_legs} " + self.translation_manager.get_translation(
+                "trade_legs", self.config_manager.get_lang()), nb_legs)
+        layout.addWidget(QLabel(self.translation_manager.get_translation("maximum", self.config_manager.get_lang())
+                                + " " + self.translation_manager.get_translation("trade_legs",
+                                                                                 self.config_manager.get_lang())
+                                + ":"))
+        layout.addWidget(self.trade_legs_combo)
 
         self.find_route_button_rework = QPushButton(self.translation_manager.get_translation("find_best_trade_routes",
                                                                                              self.config_manager.get_lang()))
@@ -278,15 +307,24 @@ class BestTradeRouteTab(QWidget):
         )
         layout.addWidget(self.sorting_order_combo)
 
-        self.trade_route_table = QTableWidget()
+        self.trade_route_table = TradeRouteTableView(
+            self.route_fields,
+            self.translation_manager.get_translation("scu", self.config_manager.get_lang()),
+            self.translation_manager.get_translation("uec", self.config_manager.get_lang()),
+            self.translation_manager.get_translation("select_to_buy", self.config_manager.get_lang()),
+            self.translation_manager.get_translation("select_to_sell", self.config_manager.get_lang()),
+            lambda trade_route: asyncio.ensure_future(self.select_to_buy(trade_route)),
+            lambda trade_route: asyncio.ensure_future(self.select_to_sell(trade_route))
+        )
+        self.trade_route_table.set_columns(self.columns)
         layout.addWidget(self.trade_route_table)
         self.setLayout(layout)
 
     async def load_systems(self):
         try:
             await self.ensure_initialized()
-            systems = await self.api.fetch_data("/star_systems")
-            for system in systems.get("data", []):
+            reference_data = await self.api.fetch_reference_data()
+            for system in reference_data.get_systems():
                 if system.get("is_available") == 1:
                     self.departure_system_combo.addItem(system["name"], system["id"])
                     self.destination_system_combo.addItem(system["name"], system["id"])
@@ -329,11 +367,11 @@ class BestTradeRouteTab(QWidget):
         if not planet_id and self.departure_planet_combo.currentData() != "all_planets":
             return
         try:
-            params = {'id_star_system': self.departure_system_combo.currentData()}
-            if self.departure_planet_combo.currentData() != "all_planets":
-                params['id_planet'] = planet_id
-            terminals = await self.api.fetch_data("/terminals", params=params)
-            self.terminals = [terminal for terminal in terminals.get("data", [])
+            if self.departure_planet_combo.currentData() == "all_planets":
+                planet_id = None
+            reference_data = await self.api.fetch_reference_data()
+            terminals = reference_data.get_terminals(self.departure_system_combo.currentData(), planet_id)
+            self.terminals = [terminal for terminal in terminals
                               if terminal.get("type") == "commodity" and terminal.get("is_available") == 1]
             logging.info("Departure terminals loaded successfully.")
         except Exception as e:
@@ -377,13 +415,14 @@ class BestTradeRouteTab(QWidget):
         if not planet_id and self.destination_planet_combo.currentData() != "all_planets":
             return
         try:
-            params = {}
-            if self.destination_system_combo.currentData() != "all_systems":
-                params['id_star_system'] = self.destination_system_combo.currentData()
-            if self.destination_planet_combo.currentData() != "all_planets":
-                params['id_planet'] = planet_id
-            terminals = await self.api.fetch_data("/terminals", params=params)
-            self.destination_terminals = [terminal for terminal in terminals.get("data", [])
+            system_id = self.destination_system_combo.currentData()
+            if system_id == "all_systems":
+                system_id = None
+            if self.destination_planet_combo.currentData() == "all_planets":
+                planet_id = None
+            reference_data = await self.api.fetch_reference_data()
+            terminals = reference_data.get_terminals(system_id, planet_id)
+            self.destination_terminals = [terminal for terminal in terminals
                                           if terminal.get("type") == "commodity" and terminal.get("is_available") == 1]
             logging.info("Destination terminals loaded successfully.")
         except Exception as e:
@@ -396,14 +435,16 @@ class BestTradeRouteTab(QWidget):
 
     async def update_page_items(self):
         await self.ensure_initialized()
-        await self.display_trade_routes(self.current_trades, self.columns, quick=False)
+        self.trade_route_table.sort_routes(self.sorting_options_combo.currentData(),
+                                           self.sorting_order_combo.currentData() == "DESC",
+                                           self.page_items_combo.currentData())
 
+    @with_request_priority(RequestPriority.SEARCH)
     async def find_best_trade_routes_users(self):
         await self.ensure_initialized()
         self.logger.log(logging.INFO, "Searching for Best Trade Routes")
-        self.trade_route_table.setRowCount(0)  # Clear previous results
-        self.trade_route_table.setColumnCount(len(self.columns))
-        self.trade_route_table.setHorizontalHeaderLabels(self.columns)
+        self.trade_route_table.clear_routes()  # Clear previous results
+        self.reset_search_state()
         await self.main_widget.set_gui_enabled(False)
         self.main_progress_bar.setVisible(True)
         self.progress_bar.setVisible(True)
@@ -413,7 +454,8 @@ class BestTradeRouteTab(QWidget):
         self.main_progress_bar.setMaximum(5)
 
         try:
-            max_scu, max_investment = self.get_input_values()
+            # /commodities_routes results do not come from the price snapshot, they are never re-scored
+            self.search_options = search_options = self.get_search_options()
             departure_system_id, departure_planet_id, destination_system_id, destination_planet_id = self.get_selected_ids()
 
             if not departure_system_id:
@@ -469,7 +511,7 @@ class BestTradeRouteTab(QWidget):
             currentProgress += 1
             self.main_progress_bar.setValue(currentProgress)
 
-            self.current_trades = await self.calculate_trade_routes_users(commodities_routes, max_scu, max_investment)
+            self.current_trades = await self.calculate_trade_routes_users(commodities_routes, search_options)
             self.logger.log(logging.INFO, f"{len(self.current_trades)} routes found")
             currentProgress += 1
             self.main_progress_bar.setValue(currentProgress)
@@ -487,12 +529,12 @@ class BestTradeRouteTab(QWidget):
             self.main_progress_bar.setVisible(False)
             self.progress_bar.setVisible(False)
 
+    @with_request_priority(RequestPriority.SEARCH)
     async def find_best_trade_routes_rework(self):
         await self.ensure_initialized()
         self.logger.log(logging.INFO, "Searching for Best Trade Routes")
-        self.trade_route_table.setRowCount(0)  # Clear previous results
-        self.trade_route_table.setColumnCount(len(self.columns))
-        self.trade_route_table.setHorizontalHeaderLabels(self.columns)
+        self.trade_route_table.clear_routes()  # Clear previous results
+        self.reset_search_state()
         await self.main_widget.set_gui_enabled(False)
         self.main_progress_bar.setVisible(True)
         self.progress_bar.setVisible(True)
@@ -503,12 +545,9 @@ class BestTradeRouteTab(QWidget):
 
         try:
             # [Recover entry parameters]
-            max_scu, max_investment = self.get_input_values()
+            self.search_options = self.get_search_options()
             departure_system_id, departure_planet_id, destination_system_id, destination_planet_id = self.get_selected_ids()
-            ignore_stocks = self.ignore_stocks_checkbox.isChecked()
-            ignore_demand = self.ignore_demand_checkbox.isChecked()
-            filter_public_hangars = self.filter_public_hangars_checkbox.isChecked()
-            filter_space_only = self.filter_space_only_checkbox.isChecked()
+            await self.load_price_snapshot()
 
             if not departure_system_id:
                 QMessageBox.warning(self, self.translation_manager.get_translation("error_input_error",
@@ -539,48 +578,35 @@ class BestTradeRouteTab(QWidget):
             destination_planets = []
             universe = len(destination_systems)
             self.progress_bar.setMaximum(universe)
-            actionProgress = 0
+            self.progress_bar.setValue(0)
             if not destination_planet_id:
-                for destination_system in destination_systems:
-                    destination_planets.extend(await self.api.fetch_planets(destination_system["id"]))
-                    actionProgress += 1
-                    self.progress_bar.setValue(actionProgress)
+                for system_planets in await gather_bounded([self.api.fetch_planets(destination_system["id"])
+                                                            for destination_system in destination_systems],
+                                                           limit=self.config_manager.get_max_concurrent_requests(),
+                                                           progress_callback=self.progress_bar.setValue):
+                    destination_planets.extend(system_planets)
                 self.logger.log(logging.INFO, f"{len(destination_planets)} Destination Planets found.")
             else:
                 destination_planets = await self.api.fetch_planets(destination_system_id, destination_planet_id)
-                actionProgress += 1
-                self.progress_bar.setValue(actionProgress)
-            currentProgress += 1
-            self.main_progress_bar.setValue(currentProgress)
-
-            # [Recover departure/destination terminals and commodities]
-            departure_terminals = await self.get_terminals_from_planets(departure_planets,
-                                                                        filter_public_hangars,
-                                                                        filter_space_only)
-            self.logger.log(logging.INFO, f"{len(departure_terminals)} Departure Terminals found.")
-            currentProgress += 1
-            self.main_progress_bar.setValue(currentProgress)
-
-            buy_commodities = await self.get_buy_commodities_from_terminals(departure_terminals)
-            self.logger.log(logging.INFO, f"{len(buy_commodities)} Buy Commodities found.")
+                self.progress_bar.setValue(universe)
             currentProgress += 1
             self.main_progress_bar.setValue(currentProgress)
 
-            sell_commodities = await self.get_sell_commodities_from_commodities_prices(buy_commodities,
-                                                                                       destination_planets,
-                                                                                       filter_public_hangars,
-                                                                                       filter_space_only)
-            self.logger.log(logging.INFO, f"{len(sell_commodities)} Sell Commodities found.")
-            currentProgress += 1
-            self.main_progress_bar.setValue(currentProgress)
+            if self.search_options.max_legs > 1:
+                departure_terminals = await self.get_terminals_from_planets(departure_planets, self.search_options)
+                self.logger.log(logging.INFO, f"{len(departure_terminals)} Departure Terminals found.")
+                self.current_trades = await self.calculate_trade_chains(departure_terminals, destination_planets,
+                                                                        self.search_options)
+                self.logger.log(logging.INFO, f"{len(self.current_trades)} Trade chains found.")
+                await self.display_trade_routes(self.current_trades, self.columns, quick=False)
+                return
 
-            self.current_trades = await self.calculate_trade_routes_rework(buy_commodities, sell_commodities,
-                                                                           max_scu, max_investment,
-                                                                           ignore_stocks, ignore_demand)
-            self.logger.log(logging.INFO, f"{len(self.current_trades)} Trade routes found.")
-            currentProgress += 1
-            self.main_progress_bar.setValue(currentProgress)
+            # [Recover departure terminals and commodities, calculate trade routes]
+            self.current_trades = await self.calculate_trade_routes_rework(departure_planets, destination_planets,
+                                                                           self.search_options)
+            self.main_progress_bar.setValue(self.main_progress_bar.maximum())
             self.logger.log(logging.INFO, f"Finished calculating Best Trade Routes : {len(self.current_trades)} found")
+            self.warn_failed_price_requests()
         except Exception as e:
             self.logger.log(logging.ERROR, f"An error occurred while finding best trade routes: {e}")
             QMessageBox.critical(self, self.translation_manager.get_translation("error_error",
@@ -598,6 +624,20 @@ class BestTradeRouteTab(QWidget):
         max_investment = float(self.max_investment_input.text()) if self.max_investment_input.text() else sys.maxsize
         return max_scu, max_investment
 
+    def get_search_options(self):
+        # Widgets are read once per search, the route engine only sees plain values
+        max_scu, max_investment = self.get_input_values()
+        return RouteSearchOptions(
+            max_scu=max_scu,
+            max_investment=max_investment,
+            ignore_stocks=self.ignore_stocks_checkbox.isChecked(),
+            ignore_demand=self.ignore_demand_checkbox.isChecked(),
+            filter_public_hangars=self.filter_public_hangars_checkbox.isChecked(),
+            filter_space_only=self.filter_space_only_checkbox.isChecked(),
+            mix_commodities=self.cargo_mix_checkbox.isChecked(),
+            max_legs=self.trade_legs_combo.currentData()
+        )
+
     def get_selected_ids(self):
         departure_system_id = self.departure_system_combo.currentData()
         departure_planet_id = self.departure_planet_combo.currentData()
@@ -611,118 +651,50 @@ class BestTradeRouteTab(QWidget):
             destination_planet_id = None
         return departure_system_id, departure_planet_id, destination_system_id, destination_planet_id
 
-    async def calculate_trade_routes_users(self, commodities_routes, max_scu, max_investment):
+    async def calculate_trade_routes_users(self, commodities_routes, search_options):
         await self.ensure_initialized()
-        trade_routes = await self.process_trade_route_users(commodities_routes, max_scu, max_investment)
+        trade_routes = await self.process_trade_route_users(commodities_routes, search_options)
         await self.display_trade_routes(trade_routes, self.columns, quick=False)
         # Allow UI to update during the search
         QApplication.processEvents()
         return trade_routes
 
-    async def get_terminals_from_planets(self, filtering_planets, filter_public_hangars=False, filter_space_only=False):
-        await self.ensure_initialized()
-        terminals = []
-        universe = len(filtering_planets)
-        self.progress_bar.setMaximum(universe)
-        actionProgress = 0
-        # Get all terminals (filter by system/planet) from /terminals
-        for planet in filtering_planets:
-            returned_terminals = await self.api.fetch_terminals(planet["id_star_system"],
-                                                                planet["id"])
-            for terminal in returned_terminals:
-                if ((not filter_public_hangars
-                     or (terminal["city_name"]
-                         or terminal["space_station_name"]))
-                    and (not filter_space_only
-                         or terminal["space_station_name"])):
-                    terminals.append(terminal)
-            actionProgress += 1
-            self.progress_bar.setValue(actionProgress)
-        return terminals
-
-    async def get_buy_commodities_from_terminals(self, departure_terminals):
+    async def get_terminals_from_planets(self, filtering_planets, search_options):
         await self.ensure_initialized()
-        buy_commodities = []
-        universe = len(departure_terminals)
-        self.progress_bar.setMaximum(universe)
-        actionProgress = 0
-        # Get all BUY commodities (for each departure terminals) from /commodities_prices
-        for departure_terminal in departure_terminals:
-            buy_commodities.extend([commodity for commodity in
-                                    await self.api.fetch_commodities_from_terminal(departure_terminal["id"])
-                                    if commodity.get("price_buy") > 0])
-            actionProgress += 1
-            self.progress_bar.setValue(actionProgress)
-        self.logger.log(logging.INFO, f"{len(buy_commodities)} Buy Commodities found.")
-        return buy_commodities
-
-    async def get_sell_commodities_from_commodities_prices(self,
-                                                           buy_commodities,
-                                                           destination_planets,
-                                                           filter_public_hangars=False,
-                                                           filter_space_only=False):
-        await self.ensure_initialized()
-        grouped_buy_commodities_ids = []
-        # Establish a GROUPED list of BUY commodities (by commodity_id)
-        grouped_buy_commodities_ids = set(map(lambda x: x["id_commodity"], buy_commodities))
-        self.logger.log(logging.INFO, f"{len(grouped_buy_commodities_ids)} Unique Buy Commodities found.")
-
-        sell_commodities = []
-        universe = len(grouped_buy_commodities_ids)
-        self.progress_bar.setMaximum(universe)
-        actionProgress = 0
-        # Get all SELL commodities (for each unique BUY commodity) from /commodities_prices
-        for grouped_buy_id in grouped_buy_commodities_ids:
-            unfiltered_commodities = await self.api.fetch_commodities_by_id(grouped_buy_id)
-            for unfiltered_commodity in unfiltered_commodities:
-                if (unfiltered_commodity["price_sell"] > 0
-                    and (not filter_public_hangars
-                         or (unfiltered_commodity["city_name"]
-                             or unfiltered_commodity["space_station_name"]))
-                    and (not filter_space_only
-                         or unfiltered_commodity["space_station_name"])):
-                    for destination_planet in destination_planets:
-                        if (unfiltered_commodity["id_star_system"] == destination_planet["id_star_system"]
-                            and ((not unfiltered_commodity["id_planet"] and len(destination_planets) > 1)
-                                 or (unfiltered_commodity["id_planet"] == destination_planet["id"]))):
-                            sell_commodities.append(unfiltered_commodity)
-            actionProgress += 1
-            self.progress_bar.setValue(actionProgress)
-        self.logger.log(logging.INFO, f"{len(sell_commodities)} Sell Commodities found.")
-        return sell_commodities
+        self.progress_bar.setMaximum(len(filtering_planets))
+        self.progress_bar.setValue(0)
+        return await fetch_filtered_terminals(self.api, filtering_planets, search_options,
+                                              limit=self.config_manager.get_max_concurrent_requests(),
+                                              progress_callback=self.progress_bar.setValue)
 
-    async def calculate_trade_routes_rework(self, buy_commodities, sell_commodities,
-                                            max_scu, max_investment, ignore_stocks,
-                                            ignore_demand):
+    async def calculate_trade_routes_rework(self, departure_planets, destination_planets, search_options):
         await self.ensure_initialized()
-        # [Calculate trade routes]
-        trade_routes = []
-        universe = len(buy_commodities) * len(sell_commodities)
-        self.progress_bar.setMaximum(universe)
-        actionProgress = 0
 
-        # For each BUY commodity / For each SELL commodity > Populate Trade routes (Display as it is populated)
-        for buy_commodity in buy_commodities:
-            for sell_commodity in sell_commodities:
-                self.progress_bar.setValue(actionProgress)
-                actionProgress += 1
-                if buy_commodity["id_commodity"] != sell_commodity["id_commodity"]:
-                    continue
-                if buy_commodity["id_terminal"] == sell_commodity["id_terminal"]:
-                    continue
-                route = await self.process_single_trade_route(buy_commodity, sell_commodity, max_scu,
-                                                              max_investment, ignore_stocks, ignore_demand)
-                if route:
-                    trade_routes.append(route)
-                    await self.display_trade_routes(trade_routes, self.columns)
-                    QApplication.processEvents()
-        self.progress_bar.setValue(actionProgress)
+        def start_step(universe):
+            self.main_progress_bar.setValue(self.main_progress_bar.value() + 1)
+            self.progress_bar.setMaximum(universe)
+            self.progress_bar.setValue(0)
+
+        # Display the leaderboard as it is populated, chunk by chunk
+        leaderboard = self.create_leaderboard()
+
+        async def display_leaderboard(trade_routes):
+            if any([leaderboard.push(route) for route in trade_routes]):
+                await self.display_trade_routes(leaderboard.ranked(5), self.columns)
+
+        trade_routes = await find_trade_routes(self.api, departure_planets, destination_planets, search_options,
+                                               self.fetch_terminal_prices, self.fetch_commodity_prices,
+                                               limit=self.config_manager.get_max_concurrent_requests(),
+                                               partial_results=self.config_manager.get_partial_results(),
+                                               step_callback=start_step, progress_callback=self.progress_bar.setValue,
+                                               trade_routes_callback=display_leaderboard,
+                                               failures_callback=self.add_failed_price_requests)
         await self.display_trade_routes(trade_routes, self.columns, quick=False)
-        QApplication.processEvents()
         return trade_routes
 
-    async def process_trade_route_users(self, commodities_routes, max_scu, max_investment):
+    async def process_trade_route_users(self, commodities_routes, search_options):
         await self.ensure_initialized()
+        reference_data = await self.api.fetch_reference_data()
         sorted_routes = []
         universe = len(commodities_routes)
         self.progress_bar.setMaximum(universe)
@@ -730,184 +702,58 @@ class BestTradeRouteTab(QWidget):
         for commodity_route in commodities_routes:
             actionProgress += 1
             self.progress_bar.setValue(actionProgress)
-            if self.filter_public_hangars_checkbox.isChecked():
-                if not commodity_route.get("is_space_station_origin", 0)\
-                   and not commodity_route.get("is_space_station_destination", 0):
-                    continue
-                terminal_origin = await self.api.fetch_terminals(commodity_route.get("id_star_system_origin"),
-                                                                 commodity_route.get("id_planet_origin"),
-                                                                 commodity_route.get("id_terminal_origin"))
-                if (not terminal_origin[0].get("city_name")):
-                    continue
-                terminal_destination = await self.api.fetch_terminals(commodity_route.get("id_star_system_destination"),
-                                                                      commodity_route.get("id_planet_destination"),
-                                                                      commodity_route.get("id_terminal_destination"))
-                if not terminal_destination[0].get("city_name"):
-                    continue
-            if self.filter_space_only_checkbox.isChecked():
-                if not commodity_route.get("is_space_station_origin", 0)\
-                   or not commodity_route.get("is_space_station_destination", 0):
-                    continue
-
-            available_scu = max_scu if self.ignore_stocks_checkbox.isChecked() else commodity_route.get("scu_origin", 0)
-            demand_scu = max_scu if self.ignore_demand_checkbox.isChecked() else commodity_route.get("scu_destination", 0)
-
-            price_buy = commodity_route.get("price_origin")
-            price_sell = commodity_route.get("price_destination")
-
-            if not price_buy or not price_sell or available_scu <= 0 or not demand_scu:
-                continue
-
-            max_buyable_scu = min(max_scu, available_scu, int(max_investment // price_buy), demand_scu)
-            if max_buyable_scu <= 0:
-                continue
-
-            investment = price_buy * max_buyable_scu
-            unit_margin = (price_sell - price_buy)
-            total_margin = unit_margin * max_buyable_scu
-            profit_margin = unit_margin / price_buy
-
-            sorted_routes.append({
-                "departure": commodity_route["origin_terminal_name"],
-                "destination": commodity_route["destination_terminal_name"],
-                "commodity": commodity_route["commodity_name"],
-                "buy_scu": str(max_buyable_scu) + " "
-                + self.translation_manager.get_translation("scu", self.config_manager.get_lang()),
-                "buy_price": str(price_buy) + " "
-                + self.translation_manager.get_translation("uec", self.config_manager.get_lang()),
-                "sell_price": str(price_sell) + " "
-                + self.translation_manager.get_translation("uec", self.config_manager.get_lang()),
-                "investment": str(investment) + " "
-                + self.translation_manager.get_translation("uec", self.config_manager.get_lang()),
-                "unit_margin": str(unit_margin) + " "
-                + self.translation_manager.get_translation("uec", self.config_manager.get_lang()),
-                "total_margin": str(total_margin) + " "
-                + self.translation_manager.get_translation("uec", self.config_manager.get_lang()),
-                "departure_scu_available": str(commodity_route.get('scu_origin', 0)) + " "
-                + self.translation_manager.get_translation("scu", self.config_manager.get_lang()),
-                "arrival_demand_scu": str(commodity_route.get('scu_destination', 0)) + " "
-                + self.translation_manager.get_translation("scu", self.config_manager.get_lang()),
-                "profit_margin": f"{round(profit_margin * 100)}%",
-                "departure_terminal_id": commodity_route["id_terminal_origin"],
-                "arrival_terminal_id": commodity_route["id_terminal_destination"],
-                "departure_system_id": commodity_route["id_star_system_origin"],
-                "arrival_system_id": commodity_route["id_star_system_destination"],
-                "departure_planet_id": commodity_route["id_planet_origin"],
-                "arrival_planet_id": commodity_route["id_planet_destination"],
-                "commodity_id": commodity_route["id_commodity"],
-                "max_buyable_scu": max_buyable_scu
-            })
+            trade_route = build_commodity_route_trade_route(commodity_route, search_options, reference_data)
+            if trade_route:
+                sorted_routes.append(trade_route)
         return sorted_routes
 
+    async def calculate_trade_chains(self, departure_terminals, destination_planets, search_options):
+        await self.ensure_initialized()
+        # Chains rebuy at the terminals they sell at, so they are planned on the prices of the whole snapshot.
+        # Without snapshot mode it is only used for this search (not re-scored on refresh), and kept as recent
+        # as the live prices of the single leg searches.
+        price_snapshot = self.price_snapshot or await self.api.fetch_price_snapshot(
+            max_age=self.api.get_cache_ttl("/commodities_prices"))
+        self.update_price_snapshot_age()
+        destination_terminals = await self.get_terminals_from_planets(destination_planets, search_options)
+        terminal_ids = {terminal["id"] for terminal in departure_terminals + destination_terminals}
+        prices = [price for terminal_id in terminal_ids for price in price_snapshot.get_terminal_prices(terminal_id)]
+        return await RouteWorkerPool().run(find_trade_chains,
+                                           [price for price in prices if price["price_buy"]],
+                                           [price for price in prices if price["price_sell"]],
+                                           [terminal["id"] for terminal in departure_terminals],
+                                           search_options.max_legs, *search_options.scoring_parameters)
+
     async def process_single_trade_route(self, buy_commodity, sell_commodity, max_scu=sys.maxsize,
                                          max_investment=sys.maxsize, ignore_stocks=False, ignore_demand=False):
         await self.ensure_initialized()
-        route = None
+        if not buy_commodity or not sell_commodity:
+            return None
         if buy_commodity["id_commodity"] != sell_commodity["id_commodity"]:
-            return route
+            return None
         if buy_commodity["id_terminal"] == sell_commodity["id_terminal"]:
-            return route
-        if buy_commodity["id"] == sell_commodity["id"]:
-            return route
-        if max_scu < 0:
-            # TODO - Send Exception instead
-            return route
-        if max_investment < 0:
-            # TODO - Send Exception instead
-            return route
-
-        available_scu = max_scu if ignore_stocks else buy_commodity.get("scu_buy", 0)
-        scu_sell_stock = sell_commodity.get("scu_sell_stock", 0)
-        scu_sell_users = sell_commodity.get("scu_sell_users", 0)
-        demand_scu = max_scu if ignore_demand else scu_sell_stock - scu_sell_users
-
-        price_buy = buy_commodity.get("price_buy")
-        price_sell = sell_commodity.get("price_sell")
-
-        if not price_buy or not price_sell or available_scu <= 0 or not demand_scu:
-            return route
-
-        max_buyable_scu = min(max_scu, available_scu, int(max_investment // price_buy), demand_scu)
-        if max_buyable_scu <= 0:
-            return route
-
-        investment = price_buy * max_buyable_scu
-        unit_margin = (price_sell - price_buy)
-        total_margin = unit_margin * max_buyable_scu
-        profit_margin = unit_margin / price_buy
-
-        buy_update = buy_commodity["date_modified"]
-        sell_update = sell_commodity["date_modified"]
-        route = {
-            "departure": buy_commodity["terminal_name"],
-            "destination": sell_commodity["terminal_name"],
-            "commodity": buy_commodity.get("commodity_name"),
-            "buy_scu": str(max_buyable_scu) + " "
-            + self.translation_manager.get_translation("scu", self.config_manager.get_lang()),
-            "buy_price": str(price_buy) + " "
-            + self.translation_manager.get_translation("uec", self.config_manager.get_lang()),
-            "sell_price": str(price_sell) + " "
-            + self.translation_manager.get_translation("uec", self.config_manager.get_lang()),
-            "investment": str(investment) + " "
-            + self.translation_manager.get_translation("uec", self.config_manager.get_lang()),
-            "unit_margin": str(unit_margin) + " "
-            + self.translation_manager.get_translation("uec", self.config_manager.get_lang()),
-            "total_margin": str(total_margin) + " "
-            + self.translation_manager.get_translation("uec", self.config_manager.get_lang()),
-            "departure_scu_available": str(buy_commodity.get('scu_buy', 0)) + " "
-            + self.translation_manager.get_translation("scu", self.config_manager.get_lang()),
-            "arrival_demand_scu": str(scu_sell_stock - scu_sell_users) + " "
-            + self.translation_manager.get_translation("scu", self.config_manager.get_lang()),
-            "profit_margin": f"{round(profit_margin * 100)} %",
-            "departure_terminal_id": buy_commodity["id_terminal"],
-            "arrival_terminal_id": sell_commodity.get("id_terminal"),
-            "departure_system_id": buy_commodity.get("id_star_system"),
-            "arrival_system_id": sell_commodity.get("id_star_system"),
-            "departure_planet_id": buy_commodity.get("id_planet"),
-            "arrival_planet_id": sell_commodity.get("id_planet"),
-            "commodity_id": buy_commodity.get("id_commodity"),
-            "max_buyable_scu": max_buyable_scu,
-            "buy_latest_update": str(buy_commodity["date_modified"]),
-            "sell_latest_update": str(sell_commodity["date_modified"]),
-            "oldest_update": str(buy_update) if buy_update < sell_update else str(sell_update),
-            "latest_update": str(buy_update) if buy_update > sell_update else str(sell_update)
-        }
-        return route
+            return None
+        scores = score_commodity_pairs([buy_commodity], [sell_commodity], max_scu,
+                                       max_investment, ignore_stocks, ignore_demand)
+        if not scores["valid"][0]:
+            return None
+        return self.build_trade_route(buy_commodity, sell_commodity, scores, 0)
 
-    async def display_trade_routes(self, trade_routes, columns, quick=True):
-        await self.ensure_initialized()
+    def build_trade_route(self, buy_commodity, sell_commodity, scores, index):
+        return build_trade_route(buy_commodity, sell_commodity, scores, index)
+
+    def create_leaderboard(self, nb_items=None):
         sorting_formula = self.sorting_options_combo.currentData()
         reverse_order = True if self.sorting_order_combo.currentData() == "DESC" else False
-        nb_items = 5 if quick else self.page_items_combo.currentData()
-        self.trade_route_table.setRowCount(0)  # Clear the table before adding sorted results
-        trade_routes.sort(key=lambda x: float(x[sorting_formula].split()[0]), reverse=reverse_order)
-        for i, route in enumerate(trade_routes[:nb_items]):
-            self.trade_route_table.insertRow(i)
-            for j, value in enumerate(route.values()):
-                if j < len(columns) - 1:
-                    item = QTableWidgetItem(str(value))
-                    item.setFlags(item.flags() & ~Qt.ItemIsEditable)  # Make the item non-editable
-                    self.trade_route_table.setItem(i, j, item)
-                else:
-                    await self.add_action_buttons(i, j, trade_routes[i])
+        nb_items = self.page_items_combo.currentData() if nb_items is None else nb_items
+        return RouteLeaderboard(nb_items, route_sort_key(sorting_formula), reverse_order)
 
-        # Resize columns to fit contents
-        self.trade_route_table.resizeColumnsToContents()
-
-    async def add_action_buttons(self, i, j, trade_route):
+    async def display_trade_routes(self, trade_routes, columns, quick=True):
         await self.ensure_initialized()
-        action_layout = QHBoxLayout()
-        buy_button = QPushButton(self.translation_manager.get_translation("select_to_buy",
-                                                                          self.config_manager.get_lang()))
-        buy_button.clicked.connect(create_async_callback(self.select_to_buy, trade_route))
-        sell_button = QPushButton(self.translation_manager.get_translation("select_to_sell",
-                                                                           self.config_manager.get_lang()))
-        sell_button.clicked.connect(create_async_callback(self.select_to_sell, trade_route))
-        action_layout.addWidget(buy_button)
-        action_layout.addWidget(sell_button)
-        action_widget = QWidget()
-        action_widget.setLayout(action_layout)
-        self.trade_route_table.setCellWidget(i, j, action_widget)
+        self.trade_route_table.display_routes(trade_routes,
+                                              self.sorting_options_combo.currentData(),
+                                              self.sorting_order_combo.currentData() == "DESC",
+                                              5 if quick else self.page_items_combo.currentData())
 
     async def select_to_buy(self, trade_route):
         await self.ensure_initialized()
@@ -935,6 +781,20 @@ class BestTradeRouteTab(QWidget):
                                  self.translation_manager.get_translation("error_generic",
                                                                           self.config_manager.get_lang()))
 
+    async def rescore_trade_route(self, trade_route):
+        if isinstance(trade_route, TradeChain):
+            legs = [await self.rescore_trade_route(leg) for leg in trade_route.legs]
+            return TradeChain(tuple(legs)) if all(legs) else None
+        if isinstance(trade_route, CargoMix):
+            trade_routes = [await self.rescore_trade_route(route) for route in trade_route.trade_routes]
+            return optimize_cargo_mix([route for route in trade_routes if route], self.search_options.max_scu,
+                                      self.search_options.max_investment)
+        return await self.process_single_trade_route(
+            self.price_snapshot.get_price(trade_route.departure_terminal_id, trade_route.commodity_id),
+            self.price_snapshot.get_price(trade_route.arrival_terminal_id, trade_route.commodity_id),
+            *self.search_options.scoring_parameters
+        )
+
     def set_gui_enabled(self, enabled):
         for input in self.findChildren(QLineEdit):
             input.setEnabled(enabled)
@@ -944,3 +804,4 @@ class BestTradeRouteTab(QWidget):
             combo.setEnabled(enabled)
         for button in self.findChildren(QPushButton):
             button.setEnabled(enabled)
+        self.trade_route_table.set_actions_enabled(enabled)
@@ -1,30 +1,232 @@
 # cache_manager.py
+import asyncio
 import time
+import json
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
 
 
 class CacheManager:
-    def __init__(self, ttl=300):
-        self.ttl = ttl  # Time-to-live for cache in seconds
-        self.cache = {}
+    """In-memory LRU cache with per-endpoint TTLs, bounded in number of entries and in bytes.
+
+    Expired entries are kept for another `stale_ratio` of their TTL, so they can be served while being revalidated.
+    """
+
+    def __init__(self, ttl=300, endpoint_ttls=None, max_entries=2000, max_bytes=64 * 1024 * 1024, stale_ratio=0):
+        self.ttl = ttl  # Default time-to-live for cache in seconds
+        self.endpoint_ttls = endpoint_ttls or {}
+        self.stale_ratio = stale_ratio
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.cache = OrderedDict()
+
+    def get_ttl(self, endpoint=None):
+        return self.endpoint_ttls.get(endpoint, self.ttl)
 
     def get(self, key):
-        if key in self.cache:
-            entry = self.cache[key]
-            if time.time() - entry['timestamp'] < self.ttl:
-                return entry['data']
-            else:
-                del self.cache[key]
+        entry = self.get_entry(key)
+        if entry and time.time() - entry['timestamp'] < entry['ttl']:
+            return entry['data']
         return None
 
-    def set(self, key, data):
-        self.cache[key] = {
+    def get_stale(self, key):
+        """Return the data of a fresh entry or of an expired one still in its stale window."""
+        entry = self.get_entry(key)
+        return entry['data'] if entry else None
+
+    def get_entry(self, key):
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry['timestamp'] >= entry['ttl'] * (1 + self.stale_ratio):
+            self.invalidate(key)
+            return None
+        self.cache.move_to_end(key)
+        return entry
+
+    def get_timestamp(self, key):
+        entry = self.cache.get(key)
+        return entry['timestamp'] if entry else None
+
+    def get_validators(self, key):
+        entry = self.cache.get(key)
+        return entry['validators'] if entry else {}
+
+    def touch(self, key, timestamp=None):
+        # The server confirmed the entry is unchanged (304): it is fresh again
+        if key in self.cache:
+            self.cache[key]['timestamp'] = timestamp if timestamp is not None else time.time()
+
+    def set(self, key, data, timestamp=None, endpoint=None, size=None, validators=None):
+        self.invalidate(key)
+        entry = {
             'data': data,
-            'timestamp': time.time()
+            'timestamp': timestamp if timestamp is not None else time.time(),
+            'ttl': self.get_ttl(endpoint),
+            'size': size if size is not None else len(json.dumps(data)),
+            'validators': validators or {}  # ETag/Last-Modified of the response, for conditional requests
         }
+        self.cache[key] = entry
+        self.size += entry['size']
+        self.evict()
+
+    def evict(self):
+        # Drop least recently used entries until both bounds are respected (the newest entry is always kept)
+        while len(self.cache) > 1 and (len(self.cache) > self.max_entries or self.size > self.max_bytes):
+            _, entry = self.cache.popitem(last=False)
+            self.size -= entry['size']
+
+    def sweep(self):
+        now = time.time()
+        expired_keys = [key for key, entry in self.cache.items()
+                        if now - entry['timestamp'] >= entry['ttl'] * (1 + self.stale_ratio)]
+        for key in expired_keys:
+            self.invalidate(key)
+        return len(expired_keys)
 
     def invalidate(self, key):
         if key in self.cache:
-            del self.cache[key]
+            self.size -= self.cache.pop(key)['size']
 
     def clear(self):
         self.cache.clear()
+        self.size = 0
+
+
+class PersistentCache:
+    """SQLite store of API responses, so data that is still fresh survives an application restart.
+
+    Writes are queued and committed together `flush_delay` seconds later, in a worker thread when an event loop runs.
+    """
+
+    def __init__(self, cache_file, max_age=None, flush_delay=1.0):
+        self.cache_file = cache_file
+        self.flush_delay = flush_delay
+        self.logger = logging.getLogger(__name__)
+        # The connection is shared with the flushing thread, the lock serializes its use
+        self.lock = threading.Lock()
+        self.pending_writes = {}
+        self.flush_handle = None
+        self.connection = sqlite3.connect(cache_file, check_same_thread=False)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS responses ("
+                                "key TEXT PRIMARY KEY, endpoint TEXT, data TEXT, timestamp REAL, validators TEXT)")
+        # Cache files created before conditional requests have no validators column
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(responses)")]
+        if "validators" not in columns:
+            self.connection.execute("ALTER TABLE responses ADD COLUMN validators TEXT")
+        self.connection.commit()
+        if max_age is not None:
+            self.prune(max_age)
+
+    def prune(self, max_age):
+        """Delete the entries older than max_age, which would never be read again."""
+        try:
+            with self.lock:
+                self.connection.execute("DELETE FROM responses WHERE timestamp < ?", (time.time() - max_age,))
+                self.connection.commit()
+        except sqlite3.Error as e:
+            self.logger.warning(f"Persistent cache pruning failed: {e}")
+
+    def get(self, key, ttl):
+        """Return (data, timestamp) for a fresh entry, or None."""
+        try:
+            with self.lock:
+                write = self.pending_writes.get(key, ("none",))
+                row = None
+                if write[0] in ("none", "touch"):
+                    row = self.connection.execute("SELECT data, timestamp FROM responses WHERE key = ?",
+                                                  (key,)).fetchone()
+            if write[0] == "set":
+                data, timestamp = write[2], write[4]
+            elif row is not None:
+                data, timestamp = row[0], write[1] if write[0] == "touch" else row[1]
+            else:
+                return None  # Missing, or about to be deleted
+            if time.time() - timestamp >= ttl:
+                self.invalidate(key)
+                return None
+            # Stored entries are JSON, queued ones are still decoded
+            return (data if row is None else json.loads(data)), timestamp
+        except (sqlite3.Error, ValueError) as e:
+            self.logger.warning(f"Persistent cache read failed for {key}: {e}")
+            return None
+
+    def get_validators(self, key):
+        try:
+            with self.lock:
+                write = self.pending_writes.get(key)
+                if write is not None and write[0] != "touch":
+                    return write[5] if write[0] == "set" else {}
+                row = self.connection.execute("SELECT validators FROM responses WHERE key = ?", (key,)).fetchone()
+            return json.loads(row[0]) if row and row[0] else {}
+        except (sqlite3.Error, ValueError) as e:
+            self.logger.warning(f"Persistent cache read failed for {key}: {e}")
+            return {}
+
+    def set(self, key, endpoint, data, timestamp=None, validators=None, body=None):
+        """Store data, as the raw response `body` when given so that it is not serialized again."""
+        self.queue_write(key, ("set", endpoint, data, body, timestamp if timestamp is not None else time.time(),
+                               validators or {}))
+
+    def touch(self, key, timestamp=None):
+        timestamp = timestamp if timestamp is not None else time.time()
+        with self.lock:
+            write = self.pending_writes.get(key)
+        if write is not None and write[0] == "set":
+            self.queue_write(key, write[:4] + (timestamp,) + write[5:])
+        elif write is None or write[0] == "touch":
+            self.queue_write(key, ("touch", timestamp))
+
+    def invalidate(self, key):
+        self.queue_write(key, ("delete",))
+
+    def queue_write(self, key, write):
+        with self.lock:
+            self.pending_writes[key] = write
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()  # No event loop to write behind
+            return
+        if self.flush_handle is None:
+            self.flush_handle = loop.call_later(self.flush_delay, self.start_flush, loop)
+
+    def start_flush(self, loop):
+        self.flush_handle = None
+        loop.run_in_executor(None, self.flush)
+
+    def flush(self):
+        """Commit the queued writes in a single transaction."""
+        with self.lock:
+            writes, self.pending_writes = self.pending_writes, {}
+            if not writes:
+                return
+            try:
+                with self.connection:  # Rolled back as a whole on failure
+                    self.connection.executemany(
+                        "INSERT OR REPLACE INTO responses (key, endpoint, data, timestamp, validators) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        [(key, endpoint, body if body is not None else json.dumps(data), timestamp, json.dumps(validators))
+                         for key, (_, endpoint, data, body, timestamp, validators) in self.writes_of(writes, "set")])
+                    self.connection.executemany("UPDATE responses SET timestamp = ? WHERE key = ?",
+                                                [(timestamp, key) for key, (_, timestamp) in self.writes_of(writes, "touch")])
+                    self.connection.executemany("DELETE FROM responses WHERE key = ?",
+                                                [(key,) for key, _ in self.writes_of(writes, "delete")])
+            except (sqlite3.Error, TypeError, ValueError) as e:
+                self.logger.warning(f"Persistent cache write failed for {len(writes)} entries: {e}")
+
+    @staticmethod
+    def writes_of(writes, action):
+        return [(key, write) for key, write in writes.items() if write[0] == action]
+
+    def clear(self):
+        try:
+            with self.lock:
+                self.pending_writes.clear()
+                self.connection.execute("DELETE FROM responses")
+                self.connection.commit()
+        except sqlite3.Error as e:
+            self.logger.warning(f"Persistent cache clearing failed: {e}")
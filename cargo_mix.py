@@ -0,0 +1,135 @@
+import sys
+from itertools import combinations
+from operator import attrgetter
+from trade_route import CargoMix
+
+# Margins closer than this are equal, against float rounding in the bounds
+MARGIN_TOLERANCE = 1e-6
+
+
+def fill_cargo(trade_routes, max_scu, max_investment, key):
+    """Greedily fill the hold with the routes in `key` order, each bounded by its own buyable SCU."""
+    allocations = []
+    scu_left, investment_left = max_scu, max_investment
+    for trade_route in sorted(trade_routes, key=key, reverse=True):
+        if trade_route.unit_margin <= 0 or not trade_route.buy_price:
+            continue
+        scu = min(trade_route.buy_scu, scu_left, int(investment_left // trade_route.buy_price))
+        if scu > 0:
+            allocations.append((trade_route, scu))
+            scu_left -= scu
+            investment_left -= scu * trade_route.buy_price
+    return allocations
+
+
+def unique_trade_routes(trade_routes):
+    """Drop the copies of a route: orbital sell offers are matched once per destination planet of their system."""
+    return list({(trade_route.departure_terminal_id, trade_route.arrival_terminal_id, trade_route.commodity_id,
+                  trade_route.commodity): trade_route for trade_route in trade_routes}.values())
+
+
+def fill_hold(trade_routes, scu_left, investment_price):
+    """Margin of the best fractional fill of the hold, each SCU costing `investment_price` per UEC invested."""
+    margin = 0
+    net_margins = sorted(((trade_route.unit_margin - investment_price * trade_route.buy_price, trade_route.buy_scu)
+                          for trade_route in trade_routes), reverse=True)
+    for net_margin, buy_scu in net_margins:
+        if net_margin <= 0 or scu_left <= 0:
+            break
+        scu = min(buy_scu, scu_left)
+        margin += net_margin * scu
+        scu_left -= scu
+    return margin
+
+
+def relaxed_margin(trade_routes, max_scu, max_investment):
+    """Upper bound of the cargo mix margin: optimum of its continuous relaxation, where SCU can be split.
+
+    By duality it is the minimum, over a price of the invested UEC, of that price times max_investment plus
+    the fractional fill of the hold by net margin per SCU. The function is convex and piecewise linear,
+    its minimum is at a price where two routes swap places in the fill or where a route stops being profitable.
+    """
+    if not trade_routes:
+        return 0
+    prices = {0} | {trade_route.unit_margin / trade_route.buy_price for trade_route in trade_routes}
+    prices |= {(first.unit_margin - second.unit_margin) / (first.buy_price - second.buy_price)
+               for first, second in combinations(trade_routes, 2) if first.buy_price != second.buy_price}
+    prices = sorted(price for price in prices if price >= 0)
+
+    def dual_margin(index):
+        return prices[index] * max_investment + fill_hold(trade_routes, max_scu, prices[index])
+
+    return dual_margin(argmin_convex(dual_margin, len(prices)))
+
+
+def argmin_convex(function, count):
+    """Minimum position of a convex function over range(count), by binary search on the sign of its differences."""
+    low, high = 0, count - 1
+    while low < high:
+        middle = (low + high) // 2
+        if function(middle + 1) >= function(middle):
+            high = middle
+        else:
+            low = middle + 1
+    return low
+
+
+class CargoMixSearch:
+    """Branch and bound over the SCU bought of each route, seeded by the greedy fills."""
+
+    def __init__(self, trade_routes, allocations):
+        self.trade_routes = sorted(trade_routes, key=attrgetter("unit_margin"), reverse=True)
+        self.best_allocations = allocations
+        self.best_margin = sum(trade_route.unit_margin * scu for trade_route, scu in allocations)
+
+    def branch(self, index, scu_left, investment_left, margin=0, allocations=()):
+        if index == len(self.trade_routes):
+            if margin > self.best_margin + MARGIN_TOLERANCE:
+                self.best_allocations, self.best_margin = allocations, margin
+            return
+        trade_route = self.trade_routes[index]
+        other_routes = self.trade_routes[index + 1:]
+        max_count = min(trade_route.buy_scu, scu_left, int(investment_left // trade_route.buy_price))
+
+        def bound(scu):
+            return margin + trade_route.unit_margin * scu + relaxed_margin(
+                other_routes, scu_left - scu, investment_left - scu * trade_route.buy_price)
+
+        # The bound is concave in the SCU of this route: explore from its peak outwards while it beats the best mix
+        peak_scu = argmin_convex(lambda scu: -bound(scu), max_count + 1)
+        for counts in (range(peak_scu, -1, -1), range(peak_scu + 1, max_count + 1)):
+            for scu in counts:
+                if bound(scu) <= self.best_margin + MARGIN_TOLERANCE:
+                    break
+                self.branch(index + 1, scu_left - scu, investment_left - scu * trade_route.buy_price,
+                            margin + trade_route.unit_margin * scu,
+                            allocations + ((trade_route, scu),) if scu else allocations)
+
+
+def optimize_cargo_mix(trade_routes, max_scu=sys.maxsize, max_investment=sys.maxsize):
+    """Bounded knapsack of the commodities of one departure/destination pair under max_scu and max_investment.
+
+    The best greedy fill, by margin per SCU or by margin per UEC, is usually optimal and prunes most of the
+    exact branch and bound search. The commodities are listed by decreasing margin.
+    """
+    trade_routes = [trade_route for trade_route in unique_trade_routes(trade_routes)
+                    if trade_route.unit_margin > 0 and trade_route.buy_price]
+    fills = [fill_cargo(trade_routes, max_scu, max_investment, attrgetter("unit_margin")),
+             fill_cargo(trade_routes, max_scu, max_investment, attrgetter("profit_margin"))]
+    search = CargoMixSearch(trade_routes, max(fills, key=lambda fill: sum(trade_route.unit_margin * scu
+                                                                          for trade_route, scu in fill)))
+    search.branch(0, max_scu, max_investment)
+    allocations = sorted(search.best_allocations, key=lambda allocation: allocation[0].unit_margin * allocation[1],
+                         reverse=True)
+    return CargoMix(tuple(allocations)) if allocations else None
+
+
+def mix_trade_routes(trade_routes, max_scu=sys.maxsize, max_investment=sys.maxsize):
+    """Replace the single commodity routes of every departure/destination pair by their best cargo mix."""
+    grouped_trade_routes = {}
+    for trade_route in trade_routes:
+        terminals = (trade_route.departure_terminal_id, trade_route.arrival_terminal_id)
+        grouped_trade_routes.setdefault(terminals, []).append(trade_route)
+    cargo_mixes = (optimize_cargo_mix(pair_routes, max_scu, max_investment)
+                   for pair_routes in grouped_trade_routes.values())
+    return [cargo_mix for cargo_mix in cargo_mixes if cargo_mix]
@@ -80,6 +80,87 @@ class ConfigManager:
         self.config["SETTINGS"]["is_production"] = str(is_production)
         self.save_config()
 
+    def get_max_concurrent_requests(self):
+        return self.config.getint("API", "max_concurrent_requests", fallback=10)
+
+    def set_max_concurrent_requests(self, max_concurrent_requests):
+        if "API" not in self.config:
+            self.config["API"] = {}
+        self.config["API"]["max_concurrent_requests"] = str(max_concurrent_requests)
+        self.save_config()
+
+    def get_connections_per_host(self):
+        return self.config.getint("API", "connections_per_host", fallback=10)
+
+    def set_connections_per_host(self, connections_per_host):
+        if "API" not in self.config:
+            self.config["API"] = {}
+        self.config["API"]["connections_per_host"] = str(connections_per_host)
+        self.save_config()
+
+    def get_request_timeout(self):
+        return self.config.getfloat("API", "request_timeout", fallback=30)
+
+    def set_request_timeout(self, request_timeout):
+        if "API" not in self.config:
+            self.config["API"] = {}
+        self.config["API"]["request_timeout"] = str(request_timeout)
+        self.save_config()
+
+    def get_requests_per_second(self):
+        return self.config.getfloat("API", "requests_per_second", fallback=10)
+
+    def set_requests_per_second(self, requests_per_second):
+        if "API" not in self.config:
+            self.config["API"] = {}
+        self.config["API"]["requests_per_second"] = str(requests_per_second)
+        self.save_config()
+
+    def get_max_retries(self):
+        return self.config.getint("API", "max_retries", fallback=3)
+
+    def set_max_retries(self, max_retries):
+        if "API" not in self.config:
+            self.config["API"] = {}
+        self.config["API"]["max_retries"] = str(max_retries)
+        self.save_config()
+
+    def get_hedge_requests(self):
+        return self.config.getboolean("API", "hedge_requests", fallback=False)
+
+    def set_hedge_requests(self, hedge_requests):
+        if "API" not in self.config:
+            self.config["API"] = {}
+        self.config["API"]["hedge_requests"] = str(hedge_requests)
+        self.save_config()
+
+    def get_partial_results(self):
+        return self.config.getboolean("API", "partial_results", fallback=True)
+
+    def set_partial_results(self, partial_results):
+        if "API" not in self.config:
+            self.config["API"] = {}
+        self.config["API"]["partial_results"] = str(partial_results)
+        self.save_config()
+
+    def get_prewarm_requests_per_minute(self):
+        return self.config.getint("API", "prewarm_requests_per_minute", fallback=60)
+
+    def set_prewarm_requests_per_minute(self, prewarm_requests_per_minute):
+        if "API" not in self.config:
+            self.config["API"] = {}
+        self.config["API"]["prewarm_requests_per_minute"] = str(prewarm_requests_per_minute)
+        self.save_config()
+
+    def get_prewarm_all_systems(self):
+        return self.config.getboolean("API", "prewarm_all_systems", fallback=False)
+
+    def set_prewarm_all_systems(self, prewarm_all_systems):
+        if "API" not in self.config:
+            self.config["API"] = {}
+        self.config["API"]["prewarm_all_systems"] = str(prewarm_all_systems)
+        self.save_config()
+
     def get_debug(self):
         return self.config.getboolean("SETTINGS", "debug", fallback=False)
 
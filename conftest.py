@@ -3,6 +3,25 @@ import asyncio
 from PyQt5.QtWidgets import QApplication
 import pytest_asyncio
 from gui import UexcorpTrader
+from trade_route import TradeRoute
+
+
+def price(id_terminal, id_commodity=5, price_buy=0, price_sell=0, **fields):
+    """/commodities_prices entry, with 100 SCU in stock; fields override any other value."""
+    return {"id_terminal": id_terminal, "id_commodity": id_commodity, "id_star_system": 1, "id_planet": None,
+            "terminal_name": f"T{id_terminal}", "commodity_name": f"C{id_commodity}", "price_buy": price_buy,
+            "price_sell": price_sell, "scu_buy": 100, "scu_sell_stock": 100, "scu_sell_users": 0,
+            "city_name": None, "space_station_name": None, "date_modified": 1, **fields}
+
+
+def route(commodity="C5", buy_scu=10, buy_price=1, unit_margin=1, **fields):
+    """Trade route from terminal 1 to terminal 2 buying buy_scu; fields override any other value."""
+    return TradeRoute(**{
+        "departure": "A", "destination": "B", "commodity": commodity, "buy_scu": buy_scu, "buy_price": buy_price,
+        "sell_price": buy_price + unit_margin, "investment": buy_scu * buy_price, "unit_margin": unit_margin,
+        "total_margin": buy_scu * unit_margin, "departure_scu_available": buy_scu, "arrival_demand_scu": buy_scu,
+        "profit_margin": unit_margin / buy_price, "departure_terminal_id": 1, "arrival_terminal_id": 2, **fields
+    })
 
 
 @pytest_asyncio.fixture(scope="session")
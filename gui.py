@@ -9,6 +9,8 @@ from best_trade_route import BestTradeRouteTab
 from config_manager import ConfigManager
 from translation_manager import TranslationManager
 from api import API
+from prewarm import PriceWarmer
+from route_workers import RouteWorkerPool
 import asyncio
 
 
@@ -23,6 +25,7 @@ class UexcorpTrader(QWidget):
         self.config_manager = None
         self.translation_manager = None
         self.api = None
+        self.price_warmer = None
 
     async def initialize(self):
         async with self._lock:
@@ -44,6 +47,12 @@ class UexcorpTrader(QWidget):
                     self.api = API._instance
                 await self.initUI(self.config_manager.get_lang())
                 await self.apply_appearance_mode(self.config_manager.get_appearance_mode())
+                # Keep the prices of the selected departure system warm for the best trade routes searches
+                self.price_warmer = PriceWarmer(self.api,
+                                                lambda: self.bestTradeRouteTab.departure_system_combo.currentData(),
+                                                self.config_manager.get_prewarm_requests_per_minute(),
+                                                self.config_manager.get_prewarm_all_systems())
+                self.price_warmer.start()
                 self._initialized.set()
 
     async def ensure_initialized(self):
@@ -87,6 +96,9 @@ class UexcorpTrader(QWidget):
 
     async def cleanup(self):
         # Cleanup resources
+        if self.price_warmer:
+            self.price_warmer.stop()
+        RouteWorkerPool().shutdown()
         await self.api.cleanup()
         # Other cleanup...
 
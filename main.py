@@ -1,11 +1,13 @@
 # main.py
 import sys
 import asyncio
+import multiprocessing
 from PyQt5.QtWidgets import QApplication
 from qasync import QEventLoop
 from gui import UexcorpTrader
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Route computations run in spawned worker processes
     app = QApplication(sys.argv)
     loop = QEventLoop(app)
     asyncio.set_event_loop(loop)
@@ -0,0 +1,76 @@
+import asyncio
+import logging
+import time
+from api import RequestPriority, make_cache_key, with_request_priority
+
+
+class PriceWarmer:
+    """Background task keeping the /commodities_prices responses used by searches warm in the API cache."""
+
+    def __init__(self, api, get_system_id, requests_per_minute=60, all_systems=False, refresh_margin=0.2,
+                 idle_interval=15):
+        self.api = api
+        self.get_system_id = get_system_id
+        self.request_interval = 60 / max(requests_per_minute, 1)  # Rate budget of the pre-warming requests
+        self.all_systems = all_systems
+        self.refresh_margin = refresh_margin  # Refresh entries in the last part of their TTL
+        self.idle_interval = idle_interval
+        self.task = None
+        self.logger = logging.getLogger(__name__)
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.ensure_future(self.run())
+
+    def stop(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
+
+    async def run(self):
+        while True:
+            try:
+                warmed_requests = await self.warm()
+                if warmed_requests:
+                    self.logger.debug(f"{warmed_requests} price requests pre-warmed")
+            except Exception as e:
+                self.logger.warning(f"Price pre-warming failed: {e}")
+                warmed_requests = 0
+            if not warmed_requests:
+                await asyncio.sleep(self.idle_interval)
+
+    @with_request_priority(RequestPriority.BACKGROUND)
+    async def warm(self):
+        warmed_requests = 0
+        commodity_ids = set()
+        for terminal in await self.get_terminals():
+            terminal_prices, warmed = await self.warm_request("/commodities_prices", {'id_terminal': terminal["id"]})
+            warmed_requests += warmed
+            commodity_ids.update(commodity["id_commodity"] for commodity in terminal_prices.get("data", [])
+                                 if commodity.get("price_buy"))
+        # Searches then look for every terminal selling the commodities bought there
+        for commodity_id in sorted(commodity_ids):
+            _, warmed = await self.warm_request("/commodities_prices", {'id_commodity': commodity_id})
+            warmed_requests += warmed
+        return warmed_requests
+
+    async def get_terminals(self):
+        if self.all_systems:
+            system_ids = [system["id"] for system in await self.api.fetch_systems_from_origin_system(None)]
+        else:
+            system_ids = [self.get_system_id()] if self.get_system_id() else []
+        terminals = []
+        for system_id in system_ids:
+            terminals.extend(await self.api.fetch_terminals(system_id))
+        return terminals
+
+    async def warm_request(self, endpoint, params):
+        cache_key = make_cache_key(endpoint, params)
+        timestamp = self.api.cache.get_timestamp(cache_key)
+        if timestamp is not None and \
+                time.time() - timestamp < self.api.get_cache_ttl(endpoint) * (1 - self.refresh_margin):
+            return self.api.cache.get(cache_key), False
+        # Entries close to expiry are fetched again, cold ones may still come from the persistent cache
+        data = await self.api.fetch_data(endpoint, params, refresh=timestamp is not None)
+        await asyncio.sleep(self.request_interval)
+        return data, True
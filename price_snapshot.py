@@ -0,0 +1,78 @@
+import time
+from dataclasses import dataclass, field
+from reference_data import index_by
+
+PRICE_SNAPSHOT_ENDPOINT = "/commodities_prices_all"
+# Only the fields used by the trade route searches are kept in the snapshot
+PRICE_SNAPSHOT_FIELDS = (
+    "id", "id_commodity", "id_terminal", "id_star_system", "id_planet", "commodity_name", "terminal_name",
+    "city_name", "space_station_name", "price_buy", "price_sell", "scu_buy", "scu_sell_stock", "scu_sell_users",
+    "is_available", "date_modified"
+)
+
+
+@dataclass(slots=True)
+class PriceSnapshotDiff:
+    added: list = field(default_factory=list)
+    updated: list = field(default_factory=list)
+    removed: list = field(default_factory=list)
+    changed_keys: set = field(init=False)
+
+    def __post_init__(self):
+        self.changed_keys = {(price["id_terminal"], price["id_commodity"])
+                             for price in self.added + self.updated + self.removed}
+
+    def __len__(self):
+        return len(self.added) + len(self.updated) + len(self.removed)
+
+    def affects(self, trade_route):
+        # Trade chains and cargo mixes are affected by a change on any of their trade routes
+        return any((route.departure_terminal_id, route.commodity_id) in self.changed_keys
+                   or (route.arrival_terminal_id, route.commodity_id) in self.changed_keys
+                   for route in getattr(trade_route, "trade_routes", (trade_route,)))
+
+
+class PriceSnapshot:
+    """Commodity prices of every terminal, indexed by terminal and by commodity so searches can run offline."""
+
+    def __init__(self, prices=(), taken_at=None):
+        self.prices = {}
+        self.prices_by_terminal = {}
+        self.prices_by_commodity = {}
+        self.taken_at = None
+        self.update(prices, taken_at)
+
+    def __len__(self):
+        return len(self.prices)
+
+    def update(self, prices, taken_at=None):
+        """Merge freshly downloaded prices, only replacing rows whose date_modified changed."""
+        fresh_prices = {price["id"]: {field: price.get(field) for field in PRICE_SNAPSHOT_FIELDS} for price in prices}
+        diff = PriceSnapshotDiff(
+            added=[price for price_id, price in fresh_prices.items() if price_id not in self.prices],
+            updated=[price for price_id, price in fresh_prices.items()
+                     if price_id in self.prices and self.prices[price_id]["date_modified"] != price["date_modified"]],
+            removed=[price for price_id, price in self.prices.items() if price_id not in fresh_prices]
+        )
+        if diff:
+            for price in diff.removed:
+                del self.prices[price["id"]]
+            for price in diff.added + diff.updated:
+                self.prices[price["id"]] = price
+            self.prices_by_terminal = index_by(self.prices.values(), "id_terminal")
+            self.prices_by_commodity = index_by(self.prices.values(), "id_commodity")
+        self.taken_at = taken_at if taken_at is not None else time.time()
+        return diff
+
+    def get_age(self):
+        return time.time() - self.taken_at
+
+    def get_price(self, terminal_id, commodity_id):
+        return next(iter(self.get_terminal_prices(terminal_id, commodity_id)), None)
+
+    def get_terminal_prices(self, terminal_id, commodity_id=None):
+        return [price for price in self.prices_by_terminal.get(terminal_id, [])
+                if not commodity_id or price["id_commodity"] == commodity_id]
+
+    def get_commodity_prices(self, commodity_id):
+        return list(self.prices_by_commodity.get(commodity_id, []))
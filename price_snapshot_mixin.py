@@ -0,0 +1,115 @@
+import asyncio
+import logging
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QCheckBox, QLabel, QMessageBox, QPushButton
+
+
+class PriceSnapshotMixin:
+    """Price snapshot controls and price lookups shared by the trade route search tabs.
+
+    The tab provides api, config_manager, translation_manager, main_widget, logger, columns, display_trade_routes
+    and rescore_trade_route, which returns the route re-scored against the current price snapshot (None if no longer
+    viable).
+    """
+
+    def add_price_snapshot_widgets(self, layout):
+        self.price_snapshot_checkbox = QCheckBox(self.translation_manager.get_translation("use_price_snapshot",
+                                                                                          self.config_manager.get_lang()))
+        layout.addWidget(self.price_snapshot_checkbox)
+        self.price_snapshot_label = QLabel()
+        layout.addWidget(self.price_snapshot_label)
+        self.refresh_price_snapshot_button = QPushButton(self.translation_manager.get_translation("refresh_price_snapshot",
+                                                                                                  self.config_manager.
+                                                                                                  get_lang()))
+        self.refresh_price_snapshot_button.clicked.connect(lambda: asyncio.ensure_future(self.refresh_price_snapshot()))
+        layout.addWidget(self.refresh_price_snapshot_button)
+        # Keep the displayed snapshot age current
+        self.price_snapshot_timer = QTimer(self)
+        self.price_snapshot_timer.timeout.connect(self.update_price_snapshot_age)
+        self.price_snapshot_timer.start(60000)
+        self.update_price_snapshot_age()
+        self.api.add_price_snapshot_listener(
+            lambda price_snapshot_diff: asyncio.ensure_future(self.update_trade_routes_prices(price_snapshot_diff))
+        )
+
+    def reset_search_state(self):
+        # Snapshot updates re-score the current results with the options and snapshot of the search that found them
+        self.current_trades = []
+        self.search_options = None
+        self.price_snapshot = None
+        self.failed_price_requests = 0
+
+    async def load_price_snapshot(self):
+        # Searches run offline against the price snapshot when enabled, otherwise prices are fetched on demand
+        self.price_snapshot = None
+        if self.price_snapshot_checkbox.isChecked():
+            self.price_snapshot = await self.api.fetch_price_snapshot()
+        self.update_price_snapshot_age()
+
+    async def refresh_price_snapshot(self):
+        await self.ensure_initialized()
+        await self.main_widget.set_gui_enabled(False)
+        try:
+            await self.api.fetch_price_snapshot(refresh=True)
+        except Exception as e:
+            self.logger.log(logging.ERROR, f"An error occurred while refreshing the price snapshot: {e}")
+            QMessageBox.critical(self, self.translation_manager.get_translation("error_error",
+                                                                                self.config_manager.get_lang()),
+                                 self.translation_manager.get_translation("error_generic",
+                                                                          self.config_manager.get_lang())
+                                 + f": {e}")
+        finally:
+            await self.main_widget.set_gui_enabled(True)
+            self.update_price_snapshot_age()
+
+    def update_price_snapshot_age(self):
+        price_snapshot = self.api.price_snapshot
+        if price_snapshot is None:
+            self.price_snapshot_label.setText(self.translation_manager.get_translation("price_snapshot_none",
+                                                                                       self.config_manager.get_lang()))
+            return
+        self.price_snapshot_label.setText(
+            self.translation_manager.get_translation("price_snapshot_age", self.config_manager.get_lang())
+            + f": {round(price_snapshot.get_age() / 60)} "
+            + self.translation_manager.get_translation("unit_minute", self.config_manager.get_lang())
+            + f" ({len(price_snapshot)} "
+            + self.translation_manager.get_translation("prices", self.config_manager.get_lang()) + ")"
+        )
+
+    async def update_trade_routes_prices(self, price_snapshot_diff):
+        # Re-score only the displayed routes whose prices changed instead of searching again
+        if self.price_snapshot is None or not self.current_trades:
+            return
+        trade_routes = []
+        for trade_route in self.current_trades:
+            if price_snapshot_diff.affects(trade_route):
+                trade_route = await self.rescore_trade_route(trade_route)
+            if trade_route:
+                trade_routes.append(trade_route)
+        self.logger.log(logging.INFO, f"{len(self.current_trades)} Trade routes updated to {len(trade_routes)} "
+                                      f"after {len(price_snapshot_diff)} price changes")
+        self.current_trades = trade_routes
+        await self.display_trade_routes(self.current_trades, self.columns, quick=False)
+
+    def add_failed_price_requests(self, count):
+        self.failed_price_requests += count
+
+    def warn_failed_price_requests(self):
+        # With partial results, tell missing prices apart from a search that really found nothing
+        if not self.failed_price_requests:
+            return
+        QMessageBox.warning(self, self.translation_manager.get_translation("warning_partial_results",
+                                                                           self.config_manager.get_lang()),
+                            f"{self.failed_price_requests} "
+                            + self.translation_manager.get_translation("error_price_requests_failed",
+                                                                       self.config_manager.get_lang()))
+
+    async def fetch_terminal_prices(self, terminal_id):
+        if self.price_snapshot:
+            return self.price_snapshot.get_terminal_prices(terminal_id)
+        return await self.api.fetch_commodities_from_terminal(terminal_id)
+
+    async def fetch_commodity_prices(self, commodity_id):
+        if self.price_snapshot:
+            return self.price_snapshot.get_commodity_prices(commodity_id)
+        return await self.api.fetch_commodities_by_id(commodity_id)
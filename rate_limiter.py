@@ -0,0 +1,116 @@
+import asyncio
+import heapq
+import itertools
+import time
+
+
+class TokenBucket:
+    """Allow `rate` acquisitions per second on average, with bursts of up to `capacity`.
+
+    Waiting acquisitions get the tokens by priority (lowest value first), then in arrival order.
+    A rate of 0 (or less) does not throttle at all.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.waiters = []
+        self.counter = itertools.count()
+        self.dispatcher = None
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self, priority=0):
+        if self.rate <= 0:
+            return
+        token = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiters, (priority, next(self.counter), token))
+        if self.dispatcher is None or self.dispatcher.done():
+            self.dispatcher = asyncio.ensure_future(self.dispatch())
+        await token
+
+    async def dispatch(self):
+        # Hands the tokens out as they are refilled, the best waiting priority first
+        while self.waiters:
+            self.refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                continue
+            _, _, token = heapq.heappop(self.waiters)
+            if not token.done():  # Skip the cancelled waiters
+                self.tokens -= 1
+                token.set_result(None)
+
+
+class AdaptiveConcurrencyLimiter:
+    """Concurrency limit adjusted with AIMD: raised while latency stays flat, halved when the server is overloaded.
+
+    Waiting requests get the freed slots by priority (lowest value first), then in arrival order.
+    """
+
+    def __init__(self, initial_limit=4, min_limit=1, max_limit=10, latency_tolerance=2.0, baseline_drift=0.01):
+        self.min_limit = min_limit
+        self.max_limit = max(max_limit, min_limit)
+        self.limit = min(max(initial_limit, min_limit), self.max_limit)
+        self.latency_tolerance = latency_tolerance  # Latency above baseline * tolerance means the server is loaded
+        self.baseline_drift = baseline_drift  # The baseline slowly follows the latency so it adapts to the network
+        self.baseline_latency = None
+        self.in_flight = 0
+        self.waiters = []
+        self.counter = itertools.count()
+
+    async def acquire(self, priority=0):
+        slot = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiters, (priority, next(self.counter), slot))
+        self.grant_slots()
+        try:
+            await slot
+        except asyncio.CancelledError:
+            if slot.done() and not slot.cancelled():
+                self.release()  # The slot was granted just before the cancellation
+            raise
+
+    def release(self):
+        self.in_flight -= 1
+        self.grant_slots()
+
+    def grant_slots(self):
+        while self.waiters and self.in_flight < int(self.limit):
+            _, _, slot = heapq.heappop(self.waiters)
+            if not slot.done():  # Skip the cancelled waiters
+                self.in_flight += 1
+                slot.set_result(None)
+
+    def slot(self, priority=0):
+        return PrioritySlot(self, priority)
+
+    def on_success(self, latency):
+        if self.baseline_latency is None or latency < self.baseline_latency:
+            self.baseline_latency = latency
+        else:
+            self.baseline_latency += (latency - self.baseline_latency) * self.baseline_drift
+        if latency <= self.baseline_latency * self.latency_tolerance:
+            # Additive increase: about one more request in flight per round of `limit` requests
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self.grant_slots()
+
+    def on_overload(self):
+        self.limit = max(self.min_limit, self.limit / 2)
+
+
+class PrioritySlot:
+    def __init__(self, limiter, priority):
+        self.limiter = limiter
+        self.priority = priority
+
+    async def __aenter__(self):
+        await self.limiter.acquire(self.priority)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.limiter.release()
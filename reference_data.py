@@ -0,0 +1,58 @@
+import time
+
+REFERENCE_DATA_ENDPOINTS = ("/star_systems", "/planets", "/terminals", "/commodities")
+
+
+def index_by(items, field):
+    grouped_items = {}
+    for item in items:
+        grouped_items.setdefault(item.get(field), []).append(item)
+    return grouped_items
+
+
+class ReferenceData:
+    """Systems, planets, terminals and commodities indexed by id, loaded once and looked up in O(1)."""
+
+    def __init__(self, systems=(), planets=(), terminals=(), commodities=(), loaded_at=None):
+        self.systems = {system["id"]: system for system in systems}
+        self.planets = {planet["id"]: planet for planet in planets}
+        self.terminals = {terminal["id"]: terminal for terminal in terminals}
+        self.commodities = {commodity["id"]: commodity for commodity in commodities}
+        self.planets_by_system = index_by(planets, "id_star_system")
+        self.terminals_by_system = index_by(terminals, "id_star_system")
+        self.terminals_by_planet = index_by(terminals, "id_planet")
+        self.loaded_at = loaded_at if loaded_at is not None else time.time()
+
+    def get_system(self, system_id):
+        return self.systems.get(system_id)
+
+    def get_planet(self, planet_id):
+        return self.planets.get(planet_id)
+
+    def get_terminal(self, terminal_id):
+        return self.terminals.get(terminal_id)
+
+    def get_commodity(self, commodity_id):
+        return self.commodities.get(commodity_id)
+
+    def get_system_name(self, system_id, default="Unknown System"):
+        return self.systems.get(system_id, {}).get("name", default)
+
+    def get_planet_name(self, planet_id, default="Unknown Planet"):
+        return self.planets.get(planet_id, {}).get("name", default)
+
+    def get_systems(self):
+        return list(self.systems.values())
+
+    def get_planets(self, system_id=None):
+        if not system_id:
+            return list(self.planets.values())
+        return list(self.planets_by_system.get(system_id, []))
+
+    def get_terminals(self, system_id=None, planet_id=None):
+        if planet_id:
+            return [terminal for terminal in self.terminals_by_planet.get(planet_id, [])
+                    if not system_id or terminal.get("id_star_system") == system_id]
+        if system_id:
+            return list(self.terminals_by_system.get(system_id, []))
+        return list(self.terminals.values())
@@ -0,0 +1,201 @@
+import logging
+import sys
+from dataclasses import dataclass, replace
+from cargo_mix import mix_trade_routes
+from route_scoring import build_trade_route, score_commodity_pairs, score_trade_routes, to_number
+from route_workers import RouteWorkerPool, compute_trade_routes, split_by_commodity
+from tools import discard_failures, gather_bounded
+from trade_route import TradeRoute
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class RouteSearchOptions:
+    """Search parameters, read once per search from the widgets or the command line."""
+    max_scu: int = sys.maxsize
+    max_investment: float = sys.maxsize
+    ignore_stocks: bool = False
+    ignore_demand: bool = False
+    filter_public_hangars: bool = False
+    filter_space_only: bool = False
+    filter_system: bool = False
+    filter_planet: bool = False
+    mix_commodities: bool = False
+    max_legs: int = 1
+
+    @property
+    def scoring_parameters(self):
+        return self.max_scu, self.max_investment, self.ignore_stocks, self.ignore_demand
+
+
+def is_allowed_terminal(terminal, options):
+    # Terminals and commodity prices share the city_name/space_station_name fields
+    return ((not options.filter_public_hangars or terminal["city_name"] or terminal["space_station_name"])
+            and (not options.filter_space_only or terminal["space_station_name"]))
+
+
+def filter_terminals(terminals, options):
+    return [terminal for terminal in terminals if is_allowed_terminal(terminal, options)]
+
+
+def filter_sell_commodities(commodities, destination_planets, options):
+    """Keep the commodities sold on the destination planets (or in orbit of their systems)."""
+    sell_commodities = []
+    for commodity in commodities:
+        if commodity["price_sell"] <= 0 or not is_allowed_terminal(commodity, options):
+            continue
+        for destination_planet in destination_planets:
+            if (commodity["id_star_system"] == destination_planet["id_star_system"]
+                and ((not commodity["id_planet"] and len(destination_planets) > 1)
+                     or commodity["id_planet"] == destination_planet["id"])):
+                sell_commodities.append(commodity)
+    return sell_commodities
+
+
+def filter_arrival_commodities(arrival_commodities, departure_system_id, departure_planet_id, departure_terminal_id,
+                               options):
+    return [arrival_commodity for arrival_commodity in arrival_commodities
+            if arrival_commodity.get("is_available") != 0
+            and arrival_commodity.get("id_terminal") != departure_terminal_id
+            and (not options.filter_system or arrival_commodity.get("id_star_system") == departure_system_id)
+            and (not options.filter_planet or arrival_commodity.get("id_planet") == departure_planet_id)
+            and is_allowed_terminal(arrival_commodity, options)]
+
+
+def calculate_trade_route_details(arrival_commodity, departure_commodity, options, reference_data,
+                                  departure_system_id=None, departure_planet_id=None, departure_terminal_id=None):
+    """Trade route buying at the departure commodity price and selling at the arrival one, None if not viable."""
+    scores = score_commodity_pairs([departure_commodity], [arrival_commodity], *options.scoring_parameters)
+    if not scores["valid"][0]:
+        return None
+    arrival_terminal = reference_data.get_terminal(arrival_commodity.get("id_terminal")) or {}
+    destination = reference_data.get_system_name(arrival_commodity.get("id_star_system")) \
+        + " - " + reference_data.get_planet_name(arrival_commodity.get("id_planet")) \
+        + " / " + arrival_commodity.get("terminal_name")
+    return replace(build_trade_route(departure_commodity, arrival_commodity, scores, 0),
+                   destination=destination,
+                   arrival_terminal_mcs=arrival_terminal.get("mcs"),
+                   departure_system_id=departure_system_id,
+                   departure_planet_id=departure_planet_id,
+                   departure_terminal_id=departure_terminal_id)
+
+
+def is_allowed_commodity_route(commodity_route, options, reference_data):
+    if options.filter_public_hangars:
+        if not commodity_route.get("is_space_station_origin", 0)\
+           and not commodity_route.get("is_space_station_destination", 0):
+            return False
+        for terminal_id in (commodity_route.get("id_terminal_origin"), commodity_route.get("id_terminal_destination")):
+            if not (reference_data.get_terminal(terminal_id) or {}).get("city_name"):
+                return False
+    if options.filter_space_only:
+        if not commodity_route.get("is_space_station_origin", 0)\
+           or not commodity_route.get("is_space_station_destination", 0):
+            return False
+    return True
+
+
+def build_commodity_route_trade_route(commodity_route, options, reference_data):
+    """Trade route from a /commodities_routes entry, None if filtered out or not viable."""
+    if not is_allowed_commodity_route(commodity_route, options, reference_data):
+        return None
+    scores = score_trade_routes([commodity_route.get("price_origin") or 0], [commodity_route.get("scu_origin", 0)],
+                                [commodity_route.get("price_destination") or 0],
+                                [commodity_route.get("scu_destination", 0)], [0], *options.scoring_parameters)
+    if not scores["valid"][0]:
+        return None
+    return TradeRoute(
+        departure=commodity_route["origin_terminal_name"],
+        destination=commodity_route["destination_terminal_name"],
+        commodity=commodity_route["commodity_name"],
+        buy_scu=to_number(scores["max_buyable_scu"][0]),
+        buy_price=commodity_route.get("price_origin"),
+        sell_price=commodity_route.get("price_destination"),
+        investment=to_number(scores["investment"][0]),
+        unit_margin=to_number(scores["unit_margin"][0]),
+        total_margin=to_number(scores["total_margin"][0]),
+        departure_scu_available=commodity_route.get('scu_origin', 0),
+        arrival_demand_scu=commodity_route.get('scu_destination', 0),
+        profit_margin=float(scores["profit_margin"][0]),
+        departure_terminal_id=commodity_route["id_terminal_origin"],
+        arrival_terminal_id=commodity_route["id_terminal_destination"],
+        departure_system_id=commodity_route["id_star_system_origin"],
+        arrival_system_id=commodity_route["id_star_system_destination"],
+        departure_planet_id=commodity_route["id_planet_origin"],
+        arrival_planet_id=commodity_route["id_planet_destination"],
+        commodity_id=commodity_route["id_commodity"]
+    )
+
+
+async def fetch_filtered_terminals(api, planets, options, limit=10, progress_callback=None):
+    """Terminals of the planets, fetched concurrently from /terminals and filtered by the search options."""
+    fetched_terminals = await gather_bounded([api.fetch_terminals(planet["id_star_system"], planet["id"])
+                                              for planet in planets],
+                                             limit=limit, progress_callback=progress_callback)
+    return [terminal for terminals in fetched_terminals for terminal in filter_terminals(terminals, options)]
+
+
+async def find_trade_routes(api, departure_planets, destination_planets, options, fetch_terminal_prices,
+                            fetch_commodity_prices, limit=10, partial_results=True, step_callback=None,
+                            progress_callback=None, trade_routes_callback=None, failures_callback=None):
+    """Single leg trade routes from the departure planets to the destination ones.
+
+    Departure terminals, their BUY prices, then the SELL prices of the same commodities are fetched concurrently
+    (prices through fetch_terminal_prices/fetch_commodity_prices, so they may come from the price snapshot), and
+    the routes are matched and scored in worker processes by chunks of commodities.
+    step_callback(universe) is called when each of these four steps starts and progress_callback(done) as it
+    progresses; trade_routes_callback(trade_routes) is awaited with the routes of each chunk as it completes.
+    With partial results, failures_callback(count) reports the price requests that failed and were skipped.
+    """
+    def start_step(universe):
+        if step_callback:
+            step_callback(universe)
+
+    def keep_successes(results):
+        failures = sum(isinstance(result, BaseException) for result in results)
+        if failures and failures_callback:
+            failures_callback(failures)
+        return discard_failures(results, logger)
+
+    start_step(len(departure_planets))
+    departure_terminals = await fetch_filtered_terminals(api, departure_planets, options, limit, progress_callback)
+    logger.info(f"{len(departure_terminals)} Departure Terminals found.")
+
+    start_step(len(departure_terminals))
+    buy_commodities = [commodity for prices in keep_successes(await gather_bounded(
+        [fetch_terminal_prices(terminal["id"]) for terminal in departure_terminals], limit=limit,
+        progress_callback=progress_callback, return_exceptions=partial_results))
+        for commodity in prices if commodity.get("price_buy") > 0]
+    logger.info(f"{len(buy_commodities)} Buy Commodities found.")
+
+    commodity_ids = {commodity["id_commodity"] for commodity in buy_commodities}
+    start_step(len(commodity_ids))
+    sell_commodities = [commodity for prices in keep_successes(await gather_bounded(
+        [fetch_commodity_prices(commodity_id) for commodity_id in commodity_ids], limit=limit,
+        progress_callback=progress_callback, return_exceptions=partial_results))
+        for commodity in filter_sell_commodities(prices, destination_planets, options)]
+    logger.info(f"{len(sell_commodities)} Sell Commodities found.")
+
+    # Matching and scoring run in worker processes, by chunks of commodities
+    worker_pool = RouteWorkerPool()
+    chunks = split_by_commodity(buy_commodities, sell_commodities, worker_pool.max_workers * 4)
+    start_step(len(chunks))
+    chunk_trade_routes = [[] for _ in chunks]
+    completed = 0
+    async for index, trade_routes in worker_pool.map_unordered(
+        compute_trade_routes,
+        [(chunk_buy_commodities, chunk_sell_commodities, *options.scoring_parameters)
+         for chunk_buy_commodities, chunk_sell_commodities in chunks]
+    ):
+        chunk_trade_routes[index] = trade_routes
+        completed += 1
+        if progress_callback:
+            progress_callback(completed)
+        if trade_routes_callback:
+            await trade_routes_callback(trade_routes)
+    trade_routes = [route for routes in chunk_trade_routes for route in routes]
+    if options.mix_commodities:
+        trade_routes = mix_trade_routes(trade_routes, options.max_scu, options.max_investment)
+    logger.info(f"{len(trade_routes)} Trade routes found.")
+    return trade_routes
@@ -0,0 +1,60 @@
+import heapq
+import sys
+from operator import attrgetter
+import numpy as np
+from reference_data import index_by
+from route_scoring import score_commodity_pairs, build_trade_route
+from trade_route import TradeChain
+
+total_margin_key = attrgetter("total_margin")
+
+
+def find_best_legs(buy_commodities, sell_commodities, max_scu=sys.maxsize, max_investment=sys.maxsize,
+                   ignore_stocks=False, ignore_demand=False, legs_per_terminal=10):
+    """Return the most profitable legs leaving each terminal: the best commodity for every pair of terminals."""
+    grouped_sell_commodities = index_by(sell_commodities, "id_commodity")
+    candidate_pairs = [(buy_commodity, sell_commodity)
+                       for buy_commodity in buy_commodities
+                       for sell_commodity in grouped_sell_commodities.get(buy_commodity["id_commodity"], [])
+                       if buy_commodity["id_terminal"] != sell_commodity["id_terminal"]]
+    if not candidate_pairs:
+        return {}
+    buy_list, sell_list = [pair[0] for pair in candidate_pairs], [pair[1] for pair in candidate_pairs]
+    scores = score_commodity_pairs(buy_list, sell_list, max_scu, max_investment, ignore_stocks, ignore_demand)
+    best_indexes = {}
+    for index in np.flatnonzero(scores["valid"] & (scores["total_margin"] > 0)):
+        terminals = (buy_list[index]["id_terminal"], sell_list[index]["id_terminal"])
+        if terminals not in best_indexes or scores["total_margin"][index] > scores["total_margin"][best_indexes[terminals]]:
+            best_indexes[terminals] = index
+    legs_by_terminal = {}
+    for (departure_terminal_id, _), index in best_indexes.items():
+        legs_by_terminal.setdefault(departure_terminal_id, []).append(
+            build_trade_route(buy_list[index], sell_list[index], scores, index))
+    return {terminal_id: heapq.nlargest(legs_per_terminal, legs, key=total_margin_key)
+            for terminal_id, legs in legs_by_terminal.items()}
+
+
+def plan_trade_chains(legs_by_terminal, departure_terminal_ids, max_legs=3, beam_width=100):
+    """Beam search of the most profitable chains of 2 to `max_legs` legs starting from the departure terminals.
+
+    Each step extends the best `beam_width` chains with the legs leaving their last terminal, a chain never
+    repeating a leg between the same two terminals (its stock or demand is already used).
+    """
+    beam = [TradeChain((leg,)) for terminal_id in departure_terminal_ids for leg in legs_by_terminal.get(terminal_id, [])]
+    trade_chains = []
+    for _ in range(max_legs - 1):
+        candidates = [trade_chain.extend(leg)
+                      for trade_chain in beam
+                      for leg in legs_by_terminal.get(trade_chain.arrival_terminal_id, [])
+                      if not trade_chain.uses(leg)]
+        beam = heapq.nlargest(beam_width, candidates, key=total_margin_key)
+        trade_chains.extend(beam)
+    return trade_chains
+
+
+def find_trade_chains(buy_commodities, sell_commodities, departure_terminal_ids, max_legs=3, max_scu=sys.maxsize,
+                      max_investment=sys.maxsize, ignore_stocks=False, ignore_demand=False):
+    """Build the legs graph then plan the chains, in one picklable call for the worker processes."""
+    legs_by_terminal = find_best_legs(buy_commodities, sell_commodities, max_scu, max_investment,
+                                      ignore_stocks, ignore_demand)
+    return plan_trade_chains(legs_by_terminal, departure_terminal_ids, max_legs)
@@ -0,0 +1,45 @@
+import heapq
+import itertools
+from operator import attrgetter
+
+
+def route_sort_key(sorting_formula):
+    return attrgetter(sorting_formula)
+
+
+class RouteLeaderboard:
+    """Keep the best `capacity` routes for a sorting key, updated in O(log K) per pushed route."""
+
+    def __init__(self, capacity, key, reverse=True):
+        self.capacity = capacity
+        self.key = key
+        self.sign = 1 if reverse else -1
+        self._heap = []
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, route):
+        # Ties are broken by insertion order (earlier first), just like a stable sort
+        entry = (self.sign * self.key(route), -next(self._counter), route)
+        if len(self._heap) < self.capacity:
+            heapq.heappush(self._heap, entry)
+            return True
+        if self.capacity <= 0:
+            return False
+        return heapq.heappushpop(self._heap, entry) is not entry
+
+    def extend(self, routes):
+        for route in routes:
+            self.push(route)
+
+    def ranked(self, limit=None):
+        limit = len(self._heap) if limit is None else limit
+        return [entry[2] for entry in heapq.nlargest(limit, self._heap)]
+
+
+def top_routes(routes, capacity, key, reverse=True):
+    leaderboard = RouteLeaderboard(capacity, key, reverse)
+    leaderboard.extend(routes)
+    return leaderboard.ranked()
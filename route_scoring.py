@@ -0,0 +1,85 @@
+import sys
+import numpy as np
+from trade_route import TradeRoute
+
+
+def to_column(commodities, field):
+    return np.fromiter((commodity.get(field) or 0 for commodity in commodities),
+                       dtype=np.float64, count=len(commodities))
+
+
+def to_number(value):
+    # Keep integral values as int so they are displayed the same way the API returned them
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+def score_trade_routes(price_buy, scu_buy, price_sell, scu_sell_stock, scu_sell_users,
+                       max_scu=sys.maxsize, max_investment=sys.maxsize,
+                       ignore_stocks=False, ignore_demand=False):
+    """Score every candidate route (one per array index) in a single vectorized pass."""
+    price_buy = np.asarray(price_buy, dtype=np.float64)
+    price_sell = np.asarray(price_sell, dtype=np.float64)
+    scu_buy = np.asarray(scu_buy, dtype=np.float64)
+    demand = np.asarray(scu_sell_stock, dtype=np.float64) - np.asarray(scu_sell_users, dtype=np.float64)
+    max_scu_column = np.full_like(price_buy, max_scu)
+
+    available_scu = max_scu_column if ignore_stocks else scu_buy
+    demand_scu = max_scu_column if ignore_demand else demand
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        investment_scu = np.floor_divide(max_investment, price_buy)
+        max_buyable_scu = np.minimum(np.minimum(max_scu_column, available_scu), np.minimum(investment_scu, demand_scu))
+        unit_margin = price_sell - price_buy
+        profit_margin = unit_margin / price_buy
+
+    valid = ((price_buy != 0) & (price_sell != 0) & (available_scu > 0) & (demand_scu != 0)
+             & (max_buyable_scu > 0) & (max_scu >= 0) & (max_investment >= 0))
+    max_buyable_scu = np.where(valid, max_buyable_scu, 0)
+    return {
+        "valid": valid,
+        "max_buyable_scu": max_buyable_scu,
+        "investment": price_buy * max_buyable_scu,
+        "unit_margin": unit_margin,
+        "total_margin": unit_margin * max_buyable_scu,
+        "profit_margin": np.where(valid, profit_margin, 0),
+        "demand_scu": demand
+    }
+
+
+def score_commodity_pairs(buy_commodities, sell_commodities, max_scu=sys.maxsize, max_investment=sys.maxsize,
+                          ignore_stocks=False, ignore_demand=False):
+    """Score aligned BUY/SELL commodity price lists, where buy_commodities[i] pairs with sell_commodities[i]."""
+    return score_trade_routes(to_column(buy_commodities, "price_buy"),
+                              to_column(buy_commodities, "scu_buy"),
+                              to_column(sell_commodities, "price_sell"),
+                              to_column(sell_commodities, "scu_sell_stock"),
+                              to_column(sell_commodities, "scu_sell_users"),
+                              max_scu, max_investment, ignore_stocks, ignore_demand)
+
+
+def build_trade_route(buy_commodity, sell_commodity, scores, index):
+    """Build the TradeRoute of the scored candidate at `index`."""
+    return TradeRoute(
+        departure=buy_commodity["terminal_name"],
+        destination=sell_commodity["terminal_name"],
+        commodity=buy_commodity.get("commodity_name"),
+        buy_scu=to_number(scores["max_buyable_scu"][index]),
+        buy_price=buy_commodity.get("price_buy"),
+        sell_price=sell_commodity.get("price_sell"),
+        investment=to_number(scores["investment"][index]),
+        unit_margin=to_number(scores["unit_margin"][index]),
+        total_margin=to_number(scores["total_margin"][index]),
+        departure_scu_available=buy_commodity.get('scu_buy', 0),
+        arrival_demand_scu=to_number(scores["demand_scu"][index]),
+        profit_margin=float(scores["profit_margin"][index]),
+        departure_terminal_id=buy_commodity["id_terminal"],
+        arrival_terminal_id=sell_commodity.get("id_terminal"),
+        departure_system_id=buy_commodity.get("id_star_system"),
+        arrival_system_id=sell_commodity.get("id_star_system"),
+        departure_planet_id=buy_commodity.get("id_planet"),
+        arrival_planet_id=sell_commodity.get("id_planet"),
+        commodity_id=buy_commodity.get("id_commodity"),
+        buy_latest_update=buy_commodity["date_modified"],
+        sell_latest_update=sell_commodity["date_modified"]
+    )
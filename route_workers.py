@@ -0,0 +1,78 @@
+import asyncio
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from reference_data import index_by
+from route_scoring import score_commodity_pairs, build_trade_route
+
+
+def compute_trade_routes(buy_commodities, sell_commodities, max_scu=sys.maxsize, max_investment=sys.maxsize,
+                         ignore_stocks=False, ignore_demand=False):
+    """Match BUY/SELL commodities on id_commodity, score the pairs and build the valid trade routes.
+
+    Pure and picklable, so it can run in a worker process.
+    """
+    grouped_sell_commodities = index_by(sell_commodities, "id_commodity")
+    candidate_pairs = [(buy_commodity, sell_commodity)
+                       for buy_commodity in buy_commodities
+                       for sell_commodity in grouped_sell_commodities.get(buy_commodity["id_commodity"], [])
+                       if buy_commodity["id_terminal"] != sell_commodity["id_terminal"]]
+    scores = score_commodity_pairs([buy_commodity for buy_commodity, _ in candidate_pairs],
+                                   [sell_commodity for _, sell_commodity in candidate_pairs],
+                                   max_scu, max_investment, ignore_stocks, ignore_demand)
+    return [build_trade_route(*candidate_pairs[index], scores, index) for index in np.flatnonzero(scores["valid"])]
+
+
+def split_by_commodity(buy_commodities, sell_commodities, nb_chunks):
+    """Split the search into chunks of whole commodities, each with only the SELL commodities it can match."""
+    grouped_buy_commodities = index_by(buy_commodities, "id_commodity")
+    grouped_sell_commodities = index_by(sell_commodities, "id_commodity")
+    commodity_ids = [commodity_id for commodity_id in grouped_buy_commodities if commodity_id in grouped_sell_commodities]
+    chunks = []
+    for chunk_index in range(min(nb_chunks, len(commodity_ids))):
+        chunk_commodity_ids = commodity_ids[chunk_index::nb_chunks]
+        chunks.append(([buy_commodity for commodity_id in chunk_commodity_ids
+                        for buy_commodity in grouped_buy_commodities[commodity_id]],
+                       [sell_commodity for commodity_id in chunk_commodity_ids
+                        for sell_commodity in grouped_sell_commodities[commodity_id]]))
+    return chunks
+
+
+class RouteWorkerPool:
+    """Process pool running the route computations off the Qt event loop."""
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super(RouteWorkerPool, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self, max_workers=None):
+        if not hasattr(self, 'singleton'):  # Ensure __init__ is only called once
+            self.max_workers = max_workers or multiprocessing.cpu_count()
+            self.executor = None
+            self.singleton = True
+
+    def get_executor(self):
+        if self.executor is None:
+            # Workers are spawned rather than forked from the process running Qt
+            self.executor = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+        return self.executor
+
+    async def run(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.get_executor(), function, *args)
+
+    async def map_unordered(self, function, arguments):
+        """Yield (index, result) for each tuple of arguments, as soon as each computation completes."""
+        async def run_indexed(index, function_arguments):
+            return index, await self.run(function, *function_arguments)
+
+        for completed in asyncio.as_completed([run_indexed(index, function_arguments)
+                                               for index, function_arguments in enumerate(arguments)]):
+            yield await completed
+
+    def shutdown(self):
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
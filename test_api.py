@@ -0,0 +1,235 @@
+import asyncio
+import time
+import aiohttp
+import pytest
+import pytest_asyncio
+from api import API, ACCEPT_ENCODING, RequestPriority, make_cache_key, request_priority, with_request_priority
+from config_manager import ConfigManager
+
+
+@pytest_asyncio.fixture
+async def api(tmp_path):
+    API._instance = None
+    api = API(ConfigManager(), cache_file=str(tmp_path / "cache.db"))
+    yield api
+    await api.cleanup()
+    api.persistent_cache.connection.close()
+    API._instance = None
+
+
+@pytest.mark.asyncio
+async def test_fetch_data_coalesces_identical_requests(api):
+    calls = []
+
+    async def request_data(endpoint, params, cache_key):
+        calls.append(cache_key)
+        await asyncio.sleep(0.01)
+        return {"data": [endpoint]}
+
+    api.request_data = request_data
+    results = await asyncio.gather(*(api.fetch_data("/star_systems") for _ in range(5)),
+                                   api.fetch_data("/planets", {'id_star_system': 1}))
+    assert len(calls) == 2
+    assert results[:5] == [{"data": ["/star_systems"]}] * 5
+    assert not api.in_flight_requests
+
+
+@pytest.mark.asyncio
+async def test_fetch_data_failure_is_shared_then_retried(api):
+    calls = []
+
+    async def request_data(endpoint, params, cache_key):
+        calls.append(cache_key)
+        await asyncio.sleep(0.01)
+        raise ValueError("offline")
+
+    api.request_data = request_data
+    results = await asyncio.gather(api.fetch_data("/terminals"), api.fetch_data("/terminals"), return_exceptions=True)
+    assert len(calls) == 1
+    assert all(isinstance(result, ValueError) for result in results)
+    with pytest.raises(ValueError):
+        await api.fetch_data("/terminals")
+    assert len(calls) == 2
+
+
+def test_make_cache_key_is_canonical():
+    assert make_cache_key("/terminals", {'id_star_system': 1, 'id_planet': 2}) \
+        == make_cache_key("/terminals", {'id_planet': '2', 'id_star_system': '1'}) \
+        == "/terminals?id_planet=2&id_star_system=1"
+    assert make_cache_key("/star_systems") == make_cache_key("/star_systems", {}) == "/star_systems"
+
+
+@pytest.mark.asyncio
+async def test_fetch_data_counts_hits_and_misses(api):
+    async def request_data(endpoint, params, cache_key):
+        data = {"data": [endpoint]}
+        api.cache.set(cache_key, data, endpoint=endpoint)
+        return data
+
+    api.request_data = request_data
+    await api.fetch_data("/planets", {'id_star_system': 1})
+    await api.fetch_data("/planets", {'id_star_system': '1'})
+    assert api.get_cache_stats() == {"/planets": {"hits": 1, "misses": 1, "hit_rate": 0.5}}
+
+
+@pytest.mark.asyncio
+async def test_session_uses_tuned_transport(api):
+    await api.initialize()
+    assert api.session.connector.limit_per_host == api.config_manager.get_connections_per_host()
+    assert api.session.headers["Accept-Encoding"] == ACCEPT_ENCODING
+    assert api.session.timeout.total == api.config_manager.get_request_timeout()
+    # The price snapshot download gets a longer deadline than the other requests
+    assert api.get_request_timeout("/commodities_prices_all").total > api.get_request_timeout("/commodities").total
+
+
+@pytest.mark.asyncio
+async def test_request_data_retries_transient_failures(api, monkeypatch):
+    monkeypatch.setattr("api.RETRY_BACKOFF_BASE", 0.001)
+    failures = [asyncio.TimeoutError(), aiohttp.ServerDisconnectedError()]
+
+    async def send_request(endpoint, params, validators=None):
+        if failures:
+            raise failures.pop(0)
+        return b'{"data": [1]}', {}
+
+    api.send_request = send_request
+    assert await api.fetch_data("/commodities") == {"data": [1]}
+    assert not failures
+
+
+@pytest.mark.asyncio
+async def test_request_data_does_not_retry_client_errors(api):
+    calls = []
+
+    async def send_request(endpoint, params, validators=None):
+        calls.append(endpoint)
+        raise aiohttp.ClientResponseError(None, (), status=404)
+
+    api.send_request = send_request
+    with pytest.raises(aiohttp.ClientResponseError):
+        await api.fetch_data("/commodities")
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_request_hedged_returns_first_successful_response(api):
+    delays = [0.5, 0.01]
+
+    async def send_request(endpoint, params, validators=None):
+        delay = delays.pop(0)
+        await asyncio.sleep(delay)
+        return str(delay).encode(), {}
+
+    api.send_request = send_request
+    api.get_hedge_delay = lambda endpoint: 0.01
+    assert await api.request_hedged("/commodities_prices", {'id_commodity': 1}) == (b"0.01", {})
+
+
+@pytest.mark.asyncio
+async def test_request_hedged_skips_cancelled_request(api):
+    delays = [0.02, 0.05]
+
+    async def send_request(endpoint, params, validators=None):
+        delay = delays.pop(0)
+        await asyncio.sleep(delay)
+        if delay == 0.02:
+            raise asyncio.CancelledError()
+        return str(delay).encode(), {}
+
+    api.send_request = send_request
+    api.get_hedge_delay = lambda endpoint: 0.01
+    assert await api.request_hedged("/commodities_prices", {'id_commodity': 1}) == (b"0.05", {})
+
+
+@pytest.mark.asyncio
+async def test_fetch_data_serves_stale_data_while_revalidating(api):
+    revalidated = asyncio.Event()
+    priorities = []
+
+    async def send_request(endpoint, params, validators=None):
+        priorities.append(request_priority.get())
+        revalidated.set()
+        return b'{"data": [2]}', {"ETag": '"v2"'}
+
+    api.send_request = send_request
+    cache_key = make_cache_key("/commodities")
+    expired_at = time.time() - api.cache.get_ttl("/commodities") - 1
+    api.cache.set(cache_key, {"data": [1]}, timestamp=expired_at, endpoint="/commodities")
+    assert await api.fetch_data("/commodities") == {"data": [1]}
+    await asyncio.wait_for(revalidated.wait(), 1)
+    await asyncio.sleep(0)
+    assert priorities == [RequestPriority.BACKGROUND]
+    assert await api.fetch_data("/commodities") == {"data": [2]}
+    assert api.persistent_cache.get_validators(cache_key) == {"ETag": '"v2"'}
+
+
+@pytest.mark.asyncio
+async def test_request_data_not_modified_refreshes_entry(api):
+    sent_validators = []
+
+    async def send_request(endpoint, params, validators=None):
+        sent_validators.append(validators)
+        return None, {}
+
+    api.send_request = send_request
+    cache_key = make_cache_key("/commodities")
+    expired_at = time.time() - api.cache.get_ttl("/commodities") - 1
+    api.cache.set(cache_key, {"data": [1]}, timestamp=expired_at, endpoint="/commodities", validators={"ETag": '"v1"'})
+    api.persistent_cache.set(cache_key, "/commodities", {"data": [1]}, expired_at, {"ETag": '"v1"'})
+    assert await api.fetch_data("/commodities", refresh=True) == {"data": [1]}
+    assert sent_validators == [{"ETag": '"v1"'}]
+    # The 304 makes the entry fresh again, in memory and on disk
+    assert api.cache.get(cache_key) == {"data": [1]}
+    assert api.persistent_cache.get(cache_key, ttl=60) is not None
+
+
+@pytest.mark.asyncio
+async def test_fetch_price_snapshot_refresh_is_conditional(api):
+    sent_validators = []
+    diffs = []
+
+    async def send_request(endpoint, params, validators=None):
+        sent_validators.append(validators)
+        if validators:
+            return None, {}
+        return b'{"data": [{"id": 1, "id_terminal": 100, "id_commodity": 5, "date_modified": 1}]}', {"ETag": '"v1"'}
+
+    api.send_request = send_request
+    api.add_price_snapshot_listener(diffs.append)
+    price_snapshot = await api.fetch_price_snapshot()
+    taken_at = price_snapshot.taken_at
+    await asyncio.sleep(0.01)
+    assert await api.fetch_price_snapshot(refresh=True) is price_snapshot
+    assert sent_validators == [{}, {"ETag": '"v1"'}]
+    # The 304 leaves the prices untouched and only dates the snapshot again
+    assert not diffs and len(price_snapshot) == 1
+    assert price_snapshot.taken_at > taken_at
+
+
+@pytest.mark.asyncio
+async def test_fetch_price_snapshot_refreshes_when_older_than_max_age(api):
+    calls = []
+
+    async def send_request(endpoint, params, validators=None):
+        calls.append(endpoint)
+        return b'{"data": [{"id": 1, "id_terminal": 100, "id_commodity": 5, "date_modified": 1}]}', {}
+
+    api.send_request = send_request
+    price_snapshot = await api.fetch_price_snapshot()
+    assert await api.fetch_price_snapshot(max_age=60) is price_snapshot
+    assert len(calls) == 1
+    price_snapshot.taken_at -= 120
+    await api.fetch_price_snapshot(max_age=60)
+    assert len(calls) == 2
+    assert price_snapshot.get_age() < 60
+
+
+@pytest.mark.asyncio
+async def test_with_request_priority_applies_to_started_tasks():
+    @with_request_priority(RequestPriority.SEARCH)
+    async def search():
+        # Requests are sent from tasks started by the search, they inherit its priority
+        return await asyncio.ensure_future(asyncio.sleep(0, request_priority.get()))
+
+    assert await search() == RequestPriority.SEARCH
+    assert request_priority.get() == RequestPriority.INTERACTIVE
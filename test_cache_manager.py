@@ -0,0 +1,112 @@
+import asyncio
+import sqlite3
+import time
+import pytest
+from cache_manager import CacheManager, PersistentCache
+
+
+def test_cache_manager_expires_entries():
+    cache = CacheManager(ttl=60)
+    cache.set("fresh", {"data": [1]})
+    cache.set("stale", {"data": [2]}, timestamp=time.time() - 120)
+    assert cache.get("fresh") == {"data": [1]}
+    assert cache.get("stale") is None
+
+
+def test_persistent_cache_survives_reopen(tmp_path):
+    cache_file = str(tmp_path / "cache.db")
+    PersistentCache(cache_file).set("/planets_{}", "/planets", {"data": [{"id": 1}]})
+    data, timestamp = PersistentCache(cache_file).get("/planets_{}", ttl=60)
+    assert data == {"data": [{"id": 1}]}
+    assert time.time() - timestamp < 60
+
+
+def test_persistent_cache_honors_ttl(tmp_path):
+    cache = PersistentCache(str(tmp_path / "cache.db"))
+    cache.set("key", "/terminals", {"data": []}, timestamp=time.time() - 100)
+    assert cache.get("key", ttl=1000) is not None
+    assert cache.get("key", ttl=50) is None
+    assert cache.get("key", ttl=1000) is None
+
+
+def test_cache_manager_per_endpoint_ttl_and_sweep():
+    cache = CacheManager(ttl=60, endpoint_ttls={"/star_systems": 3600})
+    cache.set("systems", {"data": []}, timestamp=time.time() - 120, endpoint="/star_systems")
+    cache.set("prices", {"data": []}, timestamp=time.time() - 120, endpoint="/commodities_prices")
+    assert cache.sweep() == 1
+    assert cache.get("systems") == {"data": []}
+    assert cache.get("prices") is None
+
+
+def test_cache_manager_lru_bounds():
+    cache = CacheManager(max_entries=2, max_bytes=100)
+    cache.set("a", "a", size=10)
+    cache.set("b", "b", size=10)
+    cache.get("a")
+    cache.set("c", "c", size=10)
+    assert list(cache.cache) == ["a", "c"]
+    cache.set("d", "d", size=95)
+    assert list(cache.cache) == ["d"]
+    assert cache.size == 95
+
+
+def test_cache_manager_stale_window_and_touch():
+    cache = CacheManager(ttl=60, stale_ratio=1)
+    cache.set("key", {"data": [1]}, timestamp=time.time() - 90, validators={"ETag": '"v1"'})
+    assert cache.get("key") is None
+    assert cache.get_stale("key") == {"data": [1]}
+    assert cache.get_validators("key") == {"ETag": '"v1"'}
+    cache.touch("key")
+    assert cache.get("key") == {"data": [1]}
+    cache.set("old", {"data": [2]}, timestamp=time.time() - 150)
+    assert cache.get_stale("old") is None
+
+
+def test_persistent_cache_migrates_validators_column(tmp_path):
+    cache_file = str(tmp_path / "cache.db")
+    connection = sqlite3.connect(cache_file)
+    connection.execute("CREATE TABLE responses (key TEXT PRIMARY KEY, endpoint TEXT, data TEXT, timestamp REAL)")
+    connection.execute("INSERT INTO responses VALUES ('key', '/terminals', '{\"data\": []}', ?)", (time.time(),))
+    connection.commit()
+    connection.close()
+    cache = PersistentCache(cache_file)
+    assert cache.get_validators("key") == {}
+    cache.set("key", "/terminals", {"data": []}, validators={"Last-Modified": "Sat, 17 Oct 2026 10:00:00 GMT"})
+    assert cache.get_validators("key") == {"Last-Modified": "Sat, 17 Oct 2026 10:00:00 GMT"}
+    assert cache.get("key", ttl=60)[0] == {"data": []}
+
+
+@pytest.mark.asyncio
+async def test_persistent_cache_batches_writes(tmp_path):
+    cache_file = str(tmp_path / "cache.db")
+    cache = PersistentCache(cache_file, flush_delay=0.01)
+    cache.set("key", "/terminals", {"data": [1]}, body=b'{"data": [1]}', validators={"ETag": '"v1"'})
+    cache.set("other", "/terminals", {"data": [2]})
+    # Queued writes are already visible, but not committed yet
+    assert cache.get("key", ttl=60)[0] == {"data": [1]}
+    assert cache.get_validators("key") == {"ETag": '"v1"'}
+    assert PersistentCache(cache_file).get("key", ttl=60) is None
+    await asyncio.sleep(0.1)
+    reopened_cache = PersistentCache(cache_file)
+    assert reopened_cache.get("key", ttl=60)[0] == {"data": [1]}
+    assert reopened_cache.get("other", ttl=60)[0] == {"data": [2]}
+    cache.invalidate("key")
+    cache.flush()
+    assert reopened_cache.get("key", ttl=60) is None
+
+
+def test_persistent_cache_prunes_old_entries_on_open(tmp_path):
+    cache_file = str(tmp_path / "cache.db")
+    cache = PersistentCache(cache_file)
+    cache.set("old", "/terminals", {"data": []}, timestamp=time.time() - 1000)
+    cache.set("recent", "/terminals", {"data": []}, timestamp=time.time() - 10)
+    PersistentCache(cache_file, max_age=100)
+    rows = sqlite3.connect(cache_file).execute("SELECT key FROM responses").fetchall()
+    assert rows == [("recent",)]
+
+
+def test_persistent_cache_clear_survives_closed_connection(tmp_path):
+    cache = PersistentCache(str(tmp_path / "cache.db"))
+    cache.connection.close()
+    cache.clear()
+    cache.invalidate("key")
@@ -0,0 +1,56 @@
+import itertools
+import random
+from cargo_mix import optimize_cargo_mix, mix_trade_routes
+from conftest import route
+
+
+def test_cargo_mix_fills_hold_by_margin_per_scu():
+    cargo_mix = optimize_cargo_mix([route("Gold", 60, 100, 20), route("Agri", 100, 2, 1), route("Waste", 50, 1, -1)],
+                                   max_scu=100)
+    assert [(trade_route.commodity, scu) for trade_route, scu in cargo_mix.allocations] == [("Gold", 60), ("Agri", 40)]
+    assert cargo_mix.total_margin == 60 * 20 + 40
+    assert cargo_mix.investment == 6000 + 80
+    assert cargo_mix.buy_scu == 100
+
+
+def test_cargo_mix_uses_margin_per_uec_when_investment_limits():
+    cargo_mix = optimize_cargo_mix([route("Gold", 100, 100, 20), route("Agri", 100, 2, 1)], max_scu=200,
+                                   max_investment=400)
+    # 3 SCU of Gold (60 UEC) is worse than 100 SCU of Agri (100 UEC) then 2 SCU of Gold (40 UEC)
+    assert [(trade_route.commodity, scu) for trade_route, scu in cargo_mix.allocations] == [("Agri", 100), ("Gold", 2)]
+    assert cargo_mix.total_margin == 140
+
+
+def test_mix_trade_routes_groups_by_terminal_pair():
+    cargo_mixes = mix_trade_routes([route("Gold", 10, 100, 20), route("Agri", 10, 2, 1),
+                                    route("Gold", 10, 100, 30, arrival_terminal_id=3)], max_scu=100)
+    assert sorted(cargo_mix.commodity for cargo_mix in cargo_mixes) == ["Gold (10)", "Gold (10) + Agri (10)"]
+
+
+def test_cargo_mix_is_optimal_when_greedy_is_not():
+    cargo_mix = optimize_cargo_mix([route("Gold", 1, 6, 6), route("Agri", 2, 5, 4)], max_investment=10)
+    # Both greedy fills start with Gold (6 UEC) and cannot afford Agri afterwards
+    assert [(trade_route.commodity, scu) for trade_route, scu in cargo_mix.allocations] == [("Agri", 2)]
+    assert cargo_mix.total_margin == 8
+
+
+def test_cargo_mix_matches_exhaustive_search():
+    rng = random.Random(7)
+    for _ in range(50):
+        trade_routes = [route(f"C{index}", rng.randint(1, 8), rng.randint(1, 20), rng.randint(1, 10))
+                        for index in range(rng.randint(1, 4))]
+        max_scu, max_investment = rng.randint(1, 20), rng.randint(1, 150)
+        best_margin = max(
+            sum(trade_route.unit_margin * scu for trade_route, scu in zip(trade_routes, counts))
+            for counts in itertools.product(*(range(trade_route.buy_scu + 1) for trade_route in trade_routes))
+            if sum(counts) <= max_scu
+            and sum(trade_route.buy_price * scu for trade_route, scu in zip(trade_routes, counts)) <= max_investment
+        )
+        cargo_mix = optimize_cargo_mix(trade_routes, max_scu, max_investment)
+        assert (cargo_mix.total_margin if cargo_mix else 0) == best_margin
+
+
+def test_mix_trade_routes_allocates_orbital_stock_once():
+    # An orbital sell offer is matched once per destination planet, the buy stock must still be bought once
+    cargo_mixes = mix_trade_routes([route("Gold", 20, 100, 20) for _ in range(4)], max_scu=100)
+    assert [(cargo_mix.commodity, cargo_mix.buy_scu) for cargo_mix in cargo_mixes] == [("Gold (20)", 20)]
@@ -66,3 +66,30 @@ async def default_test_get_window_size(config_manager):
 async def test_get_window_size(config_manager):
     config_manager.set_window_size(1024, 768)
     assert config_manager.get_window_size() == (1024, 768)
+
+
+@pytest.mark.asyncio
+async def test_get_prewarm_settings(config_manager):
+    config_manager.set_prewarm_requests_per_minute(30)
+    config_manager.set_prewarm_all_systems(True)
+    assert config_manager.get_prewarm_requests_per_minute() == 30
+    assert config_manager.get_prewarm_all_systems() is True
+    config_manager.set_prewarm_requests_per_minute(60)
+    config_manager.set_prewarm_all_systems(False)
+
+
+@pytest.mark.asyncio
+async def test_get_transport_settings(config_manager):
+    config_manager.set_connections_per_host(4)
+    config_manager.set_request_timeout(12.5)
+    assert config_manager.get_connections_per_host() == 4
+    assert config_manager.get_request_timeout() == 12.5
+    config_manager.set_connections_per_host(10)
+    config_manager.set_request_timeout(30)
+
+
+@pytest.mark.asyncio
+async def test_get_requests_per_second(config_manager):
+    config_manager.set_requests_per_second(2.5)
+    assert config_manager.get_requests_per_second() == 2.5
+    config_manager.set_requests_per_second(10)
@@ -0,0 +1,47 @@
+import time
+import pytest
+from api import make_cache_key
+from cache_manager import CacheManager
+from prewarm import PriceWarmer
+
+TERMINAL_PRICES = {100: [{"id_commodity": 5, "price_buy": 10}, {"id_commodity": 6, "price_buy": 0}],
+                   110: [{"id_commodity": 7, "price_buy": 20}]}
+
+
+class FakeAPI:
+    def __init__(self):
+        self.cache = CacheManager(ttl=300)
+        self.requests = []
+
+    def get_cache_ttl(self, endpoint):
+        return self.cache.get_ttl(endpoint)
+
+    async def fetch_terminals(self, system_id):
+        return [{"id": 100}, {"id": 110}] if system_id == 1 else []
+
+    async def fetch_data(self, endpoint, params=None, refresh=False):
+        self.requests.append((params, refresh))
+        data = {"data": TERMINAL_PRICES.get(params.get('id_terminal'), [])}
+        self.cache.set(make_cache_key(endpoint, params), data)
+        return data
+
+
+@pytest.mark.asyncio
+async def test_price_warmer_warms_terminals_then_commodities():
+    api = FakeAPI()
+    price_warmer = PriceWarmer(api, lambda: 1, requests_per_minute=60000)
+    assert await price_warmer.warm() == 4
+    assert [params for params, _ in api.requests] == [{'id_terminal': 100}, {'id_terminal': 110},
+                                                      {'id_commodity': 5}, {'id_commodity': 7}]
+    assert await price_warmer.warm() == 0
+
+
+@pytest.mark.asyncio
+async def test_price_warmer_refreshes_ahead_of_expiry():
+    api = FakeAPI()
+    price_warmer = PriceWarmer(api, lambda: 1, requests_per_minute=60000, refresh_margin=0.2)
+    api.cache.set(make_cache_key("/commodities_prices", {'id_terminal': 100}), {"data": []}, time.time() - 250)
+    api.cache.set(make_cache_key("/commodities_prices", {'id_terminal': 110}), {"data": []}, time.time() - 100)
+    assert await price_warmer.warm() == 2
+    assert api.requests == [({'id_terminal': 100}, True), ({'id_commodity': 5}, False)]
+    assert await PriceWarmer(api, lambda: None).warm() == 0
@@ -0,0 +1,117 @@
+import logging
+import time
+from types import SimpleNamespace
+import pytest
+import price_snapshot_mixin
+from price_snapshot import PriceSnapshot
+from price_snapshot_mixin import PriceSnapshotMixin
+from translation_manager import TranslationManager
+
+PRICES = [{"id": 1, "id_terminal": 100, "id_commodity": 5, "price_buy": 10, "screenshot": "unused"},
+          {"id": 2, "id_terminal": 100, "id_commodity": 6, "price_buy": 3},
+          {"id": 3, "id_terminal": 110, "id_commodity": 5, "price_sell": 15}]
+
+
+def test_price_snapshot_lookups():
+    price_snapshot = PriceSnapshot(PRICES)
+    assert len(price_snapshot) == 3
+    assert [price["id"] for price in price_snapshot.get_terminal_prices(100)] == [1, 2]
+    assert [price["id"] for price in price_snapshot.get_terminal_prices(100, 6)] == [2]
+    assert [price["id"] for price in price_snapshot.get_commodity_prices(5)] == [1, 3]
+    assert price_snapshot.get_terminal_prices(999) == []
+    assert "screenshot" not in price_snapshot.get_terminal_prices(100)[0]
+
+
+def test_price_snapshot_age():
+    price_snapshot = PriceSnapshot(PRICES, taken_at=time.time() - 600)
+    assert 600 <= price_snapshot.get_age() < 660
+
+
+def test_price_snapshot_update_reports_diff():
+    price_snapshot = PriceSnapshot([dict(price, date_modified=1) for price in PRICES])
+    unchanged_price = price_snapshot.get_price(100, 6)
+    diff = price_snapshot.update([dict(PRICES[0], date_modified=2, price_buy=12), dict(PRICES[1], date_modified=1),
+                                  {"id": 4, "id_terminal": 120, "id_commodity": 5, "date_modified": 2}])
+    assert [price["id"] for price in diff.added] == [4]
+    assert [price["id"] for price in diff.updated] == [1]
+    assert [price["id"] for price in diff.removed] == [3]
+    assert diff.changed_keys == {(100, 5), (120, 5), (110, 5)}
+    assert price_snapshot.get_price(100, 5)["price_buy"] == 12
+    assert price_snapshot.get_price(100, 6) is unchanged_price
+    assert price_snapshot.get_price(110, 5) is None
+    assert [price["id"] for price in price_snapshot.get_commodity_prices(5)] == [1, 4]
+    assert not price_snapshot.update(price_snapshot.prices.values())
+
+
+class FakeAPI:
+    async def fetch_commodities_from_terminal(self, terminal_id):
+        return [{"id_terminal": terminal_id, "source": "api"}]
+
+    async def fetch_commodities_by_id(self, commodity_id):
+        return [{"id_commodity": commodity_id, "source": "api"}]
+
+
+@pytest.mark.asyncio
+async def test_price_snapshot_mixin_fetches_prices_from_snapshot_when_loaded():
+    tab = PriceSnapshotMixin()
+    tab.api = FakeAPI()
+    tab.reset_search_state()
+    assert await tab.fetch_terminal_prices(100) == [{"id_terminal": 100, "source": "api"}]
+    assert await tab.fetch_commodity_prices(5) == [{"id_commodity": 5, "source": "api"}]
+    tab.price_snapshot = PriceSnapshot(PRICES)
+    assert [price["id"] for price in await tab.fetch_terminal_prices(100)] == [1, 2]
+    assert [price["id"] for price in await tab.fetch_commodity_prices(5)] == [1, 3]
+
+
+class FakeTab(PriceSnapshotMixin):
+    columns = []
+
+    def __init__(self, prices):
+        self.logger = logging.getLogger(__name__)
+        self.reset_search_state()
+        self.price_snapshot = PriceSnapshot(prices)
+        self.displayed = None
+
+    async def rescore_trade_route(self, trade_route):
+        price = self.price_snapshot.get_price(trade_route.departure_terminal_id, trade_route.commodity_id)
+        return SimpleNamespace(**dict(vars(trade_route), buy_price=price["price_buy"])) if price else None
+
+    async def display_trade_routes(self, trade_routes, columns, quick=True):
+        self.displayed = trade_routes
+
+
+@pytest.mark.asyncio
+async def test_price_snapshot_mixin_rescores_only_affected_routes():
+    tab = FakeTab(PRICES)
+    unaffected_route = SimpleNamespace(departure_terminal_id=100, arrival_terminal_id=110, commodity_id=6, buy_price=3)
+    tab.current_trades = [
+        SimpleNamespace(departure_terminal_id=100, arrival_terminal_id=110, commodity_id=5, buy_price=10),
+        unaffected_route
+    ]
+    diff = tab.price_snapshot.update([dict(PRICES[0], date_modified=2, price_buy=12), PRICES[1], PRICES[2]])
+    await tab.update_trade_routes_prices(diff)
+    assert [route.buy_price for route in tab.displayed] == [12, 3]
+    assert tab.displayed[1] is unaffected_route
+    # Routes that are no longer viable are dropped
+    diff = tab.price_snapshot.update([PRICES[1], PRICES[2]])
+    await tab.update_trade_routes_prices(diff)
+    assert tab.current_trades == tab.displayed == [unaffected_route]
+
+
+@pytest.mark.asyncio
+async def test_price_snapshot_mixin_warns_about_failed_price_requests(qapp, config_manager, monkeypatch):
+    warnings = []
+    monkeypatch.setattr(price_snapshot_mixin.QMessageBox, "warning",
+                        lambda parent, title, text: warnings.append(text))
+    tab = FakeTab(PRICES)
+    tab.config_manager = config_manager
+    tab.translation_manager = TranslationManager()
+    tab.warn_failed_price_requests()
+    assert warnings == []
+    tab.add_failed_price_requests(2)
+    tab.add_failed_price_requests(1)
+    tab.warn_failed_price_requests()
+    assert warnings == ["3 " + tab.translation_manager.get_translation("error_price_requests_failed",
+                                                                       config_manager.get_lang())]
+    tab.reset_search_state()
+    assert tab.failed_price_requests == 0
@@ -0,0 +1,84 @@
+import asyncio
+import time
+import pytest
+from rate_limiter import AdaptiveConcurrencyLimiter, TokenBucket
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_limits_rate_after_burst():
+    token_bucket = TokenBucket(rate=100, capacity=5)
+    started_at = time.monotonic()
+    for _ in range(5):
+        await token_bucket.acquire()
+    assert time.monotonic() - started_at < 0.02
+    for _ in range(5):
+        await token_bucket.acquire()
+    assert time.monotonic() - started_at >= 0.04
+
+
+@pytest.mark.asyncio
+async def test_adaptive_concurrency_limits_in_flight_requests():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=10)
+    in_flight = 0
+    max_in_flight = 0
+
+    async def request():
+        nonlocal in_flight, max_in_flight
+        async with limiter.slot():
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+
+    await asyncio.gather(*(request() for _ in range(6)))
+    assert max_in_flight == 2
+
+
+def test_adaptive_concurrency_aimd():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=4)
+    for _ in range(10):
+        limiter.on_success(0.1)
+    assert limiter.limit > 3
+    # Latency far above the baseline holds the limit
+    limit = limiter.limit
+    limiter.on_success(1)
+    assert limiter.limit == limit
+    limiter.on_overload()
+    assert limiter.limit == limit / 2
+    for _ in range(5):
+        limiter.on_overload()
+    assert limiter.limit == 1
+
+
+@pytest.mark.asyncio
+async def test_adaptive_concurrency_grants_slots_by_priority():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=1, max_limit=1)
+    order = []
+
+    async def request(name, priority):
+        async with limiter.slot(priority):
+            order.append(name)
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(request("search 1", 1), request("background", 2), request("search 2", 1),
+                         request("interactive", 0))
+    assert order == ["search 1", "interactive", "search 2", "background"]
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_serves_priorities_first():
+    token_bucket = TokenBucket(rate=100, capacity=1)
+    order = []
+
+    async def request(name, priority):
+        await token_bucket.acquire(priority)
+        order.append(name)
+
+    await asyncio.gather(*(request(f"search {i}", 1) for i in range(3)), request("interactive", 0))
+    assert order == ["interactive", "search 0", "search 1", "search 2"]
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_zero_rate_is_unlimited():
+    token_bucket = TokenBucket(rate=0)
+    await asyncio.wait_for(asyncio.gather(*(token_bucket.acquire() for _ in range(100))), 1)
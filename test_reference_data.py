@@ -0,0 +1,27 @@
+from reference_data import ReferenceData
+
+SYSTEMS = [{"id": 1, "name": "Stanton"}, {"id": 2, "name": "Pyro"}]
+PLANETS = [{"id": 10, "name": "Hurston", "id_star_system": 1}, {"id": 20, "name": "Pyro I", "id_star_system": 2}]
+TERMINALS = [{"id": 100, "id_star_system": 1, "id_planet": 10, "mcs": 1},
+             {"id": 101, "id_star_system": 1, "id_planet": 0, "mcs": 0},
+             {"id": 200, "id_star_system": 2, "id_planet": 20, "mcs": 0}]
+
+
+def test_reference_data_lookups():
+    reference_data = ReferenceData(SYSTEMS, PLANETS, TERMINALS, [{"id": 5, "name": "Gold"}])
+    assert reference_data.get_system_name(2) == "Pyro"
+    assert reference_data.get_planet_name(10) == "Hurston"
+    assert reference_data.get_planet_name(99) == "Unknown Planet"
+    assert reference_data.get_terminal(100)["mcs"] == 1
+    assert reference_data.get_commodity(5)["name"] == "Gold"
+    assert reference_data.get_planets(1) == [PLANETS[0]]
+    assert len(reference_data.get_planets()) == 2
+
+
+def test_reference_data_terminals_filters():
+    reference_data = ReferenceData(SYSTEMS, PLANETS, TERMINALS)
+    assert [terminal["id"] for terminal in reference_data.get_terminals(1)] == [100, 101]
+    assert [terminal["id"] for terminal in reference_data.get_terminals(1, 10)] == [100]
+    assert reference_data.get_terminals(2, 10) == []
+    assert [terminal["id"] for terminal in reference_data.get_terminals(planet_id=20)] == [200]
+    assert len(reference_data.get_terminals()) == 3
@@ -0,0 +1,84 @@
+import sys
+from conftest import price
+from reference_data import ReferenceData
+from route_engine import (
+    RouteSearchOptions, build_commodity_route_trade_route, calculate_trade_route_details, filter_arrival_commodities,
+    filter_sell_commodities, filter_terminals
+)
+
+REFERENCE_DATA = ReferenceData(
+    systems=[{"id": 1, "name": "Stanton"}],
+    planets=[{"id": 10, "name": "Hurston", "id_star_system": 1}, {"id": 11, "name": "ArcCorp", "id_star_system": 1}],
+    terminals=[{"id": 100, "city_name": "Lorville", "mcs": 1}, {"id": 110, "city_name": None, "mcs": 0}]
+)
+
+
+def test_filter_terminals():
+    terminals = [{"id": 1, "city_name": "Lorville", "space_station_name": None},
+                 {"id": 2, "city_name": None, "space_station_name": "Everus"},
+                 {"id": 3, "city_name": None, "space_station_name": None}]
+    assert len(filter_terminals(terminals, RouteSearchOptions())) == 3
+    assert [terminal["id"] for terminal in filter_terminals(terminals, RouteSearchOptions(filter_public_hangars=True))] \
+        == [1, 2]
+    assert [terminal["id"] for terminal in filter_terminals(terminals, RouteSearchOptions(filter_space_only=True))] \
+        == [2]
+
+
+def test_filter_sell_commodities():
+    commodities = [price(100, price_sell=15, id_planet=10), price(110, price_sell=15, id_planet=11),
+                   price(120, id_planet=11), price(130, price_sell=15)]
+    planets = REFERENCE_DATA.get_planets(1)
+    assert [commodity["id_terminal"] for commodity in filter_sell_commodities(commodities, planets[:1],
+                                                                              RouteSearchOptions())] == [100]
+    # Commodities sold in orbit are kept once per destination planet
+    assert [commodity["id_terminal"] for commodity in filter_sell_commodities(commodities, planets,
+                                                                              RouteSearchOptions())] \
+        == [100, 110, 130, 130]
+
+
+def test_filter_arrival_commodities():
+    arrival_commodities = [price(100, price_sell=15, id_planet=10), price(110, price_sell=15, id_planet=11),
+                           price(120, price_sell=15, id_planet=10)]
+    assert [commodity["id_terminal"] for commodity in filter_arrival_commodities(
+        arrival_commodities, 1, 10, 120, RouteSearchOptions())] == [100, 110]
+    assert [commodity["id_terminal"] for commodity in filter_arrival_commodities(
+        arrival_commodities, 1, 10, 120, RouteSearchOptions(filter_planet=True))] == [100]
+
+
+def test_calculate_trade_route_details():
+    departure_commodity = price(110, price_buy=10, id_planet=11)
+    arrival_commodity = price(100, price_sell=15, id_planet=10, scu_sell_users=50)
+    trade_route = calculate_trade_route_details(arrival_commodity, departure_commodity,
+                                                RouteSearchOptions(max_investment=300), REFERENCE_DATA, 1, 11, 110)
+    assert (trade_route.destination, trade_route.buy_scu, trade_route.total_margin, trade_route.arrival_terminal_mcs) \
+        == ("Stanton - Hurston / T100", 30, 150, 1)
+    # Demand is the stock less what users already sell
+    trade_route = calculate_trade_route_details(arrival_commodity, departure_commodity, RouteSearchOptions(),
+                                                REFERENCE_DATA)
+    assert trade_route.buy_scu == 50
+    trade_route = calculate_trade_route_details(arrival_commodity, departure_commodity,
+                                                RouteSearchOptions(max_scu=80, ignore_demand=True), REFERENCE_DATA)
+    assert trade_route.buy_scu == 80
+    assert calculate_trade_route_details(arrival_commodity, arrival_commodity, RouteSearchOptions(),
+                                         REFERENCE_DATA) is None
+
+
+def test_build_commodity_route_trade_route():
+    commodity_route = {
+        "id_commodity": 5, "commodity_name": "C5", "price_origin": 10, "price_destination": 15, "scu_origin": 100,
+        "scu_destination": 40, "id_terminal_origin": 100, "id_terminal_destination": 110,
+        "origin_terminal_name": "T100", "destination_terminal_name": "T110", "id_star_system_origin": 1,
+        "id_star_system_destination": 1, "id_planet_origin": 10, "id_planet_destination": 11,
+        "is_space_station_origin": 0, "is_space_station_destination": 1
+    }
+    trade_route = build_commodity_route_trade_route(commodity_route, RouteSearchOptions(), REFERENCE_DATA)
+    assert (trade_route.buy_scu, trade_route.total_margin) == (40, 200)
+    assert build_commodity_route_trade_route(commodity_route, RouteSearchOptions(filter_space_only=True),
+                                             REFERENCE_DATA) is None
+    # T110 has no public hangar
+    assert build_commodity_route_trade_route(commodity_route, RouteSearchOptions(filter_public_hangars=True),
+                                             REFERENCE_DATA) is None
+
+
+def test_search_options_scoring_parameters():
+    assert RouteSearchOptions(max_scu=10, ignore_demand=True).scoring_parameters == (10, sys.maxsize, False, True)
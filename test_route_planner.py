@@ -0,0 +1,26 @@
+from conftest import price
+from route_planner import find_best_legs, plan_trade_chains
+
+PRICES = [price(1, 5, price_buy=10), price(2, 5, price_sell=15), price(3, 5, price_sell=12),
+          price(2, 6, price_buy=4), price(3, 6, price_sell=9), price(1, 6, price_sell=6),
+          price(3, 7, price_buy=2), price(1, 7, price_sell=3)]
+
+
+def test_find_best_legs_keeps_best_commodity_per_terminal_pair():
+    legs_by_terminal = find_best_legs([p for p in PRICES if p["price_buy"]], [p for p in PRICES if p["price_sell"]])
+    assert [(leg.arrival_terminal_id, leg.commodity, leg.total_margin) for leg in legs_by_terminal[1]] \
+        == [(2, "C5", 500), (3, "C5", 200)]
+    assert [(leg.arrival_terminal_id, leg.total_margin) for leg in legs_by_terminal[2]] == [(3, 500), (1, 200)]
+
+
+def test_plan_trade_chains_finds_best_loop():
+    legs_by_terminal = find_best_legs([p for p in PRICES if p["price_buy"]], [p for p in PRICES if p["price_sell"]])
+    trade_chains = plan_trade_chains(legs_by_terminal, [1], max_legs=3)
+    best_chain = max(trade_chains, key=lambda trade_chain: trade_chain.total_margin)
+    assert [leg.arrival_terminal_id for leg in best_chain.legs] == [2, 3, 1]
+    assert best_chain.total_margin == 500 + 500 + 100
+    assert best_chain.commodity == "C5 > C6 > C7"
+    assert best_chain.investment == 1000
+    assert {len(trade_chain.legs) for trade_chain in trade_chains} == {2, 3}
+    assert all(len({(leg.departure_terminal_id, leg.arrival_terminal_id) for leg in trade_chain.legs})
+               == len(trade_chain.legs) for trade_chain in trade_chains)
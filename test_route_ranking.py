@@ -0,0 +1,37 @@
+import random
+from conftest import route
+from route_ranking import RouteLeaderboard, route_sort_key, top_routes
+from trade_route import format_trade_route
+
+
+def make_routes(count):
+    rng = random.Random(42)
+    return [route(total_margin=rng.randint(0, 50)) for _ in range(count)]
+
+
+def test_top_routes_matches_stable_sort():
+    routes = make_routes(300)
+    key = route_sort_key("total_margin")
+    for reverse in (True, False):
+        expected = sorted(routes, key=key, reverse=reverse)[:20]
+        ranked = top_routes(routes, 20, key, reverse)
+        assert [id(route) for route in ranked] == [id(route) for route in expected]
+
+
+def test_leaderboard_push_reports_changes():
+    leaderboard = RouteLeaderboard(2, route_sort_key("total_margin"))
+    assert leaderboard.push(route(total_margin=10))
+    assert leaderboard.push(route(total_margin=5))
+    assert not leaderboard.push(route(total_margin=1))
+    assert leaderboard.push(route(total_margin=20))
+    assert [route.total_margin for route in leaderboard.ranked()] == [20, 10]
+    assert len(leaderboard) == 2
+
+
+def test_route_update_keys_and_formatting():
+    trade_route = route("Gold", 10, 1.5, 0.5, buy_latest_update=200, sell_latest_update=100)
+    assert trade_route.oldest_update == 100 and trade_route.latest_update == 200
+    assert route_sort_key("oldest_update")(trade_route) == 100
+    assert format_trade_route(trade_route, ["commodity", "buy_scu", "buy_price", "profit_margin"], "SCU", "UEC") == [
+        "Gold", "10 SCU", "1.5 UEC", "33 %"
+    ]
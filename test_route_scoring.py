@@ -0,0 +1,36 @@
+import sys
+from route_scoring import score_commodity_pairs, score_trade_routes, to_number
+
+
+def test_score_trade_routes_limits():
+    scores = score_trade_routes(price_buy=[10, 10, 10, 0], scu_buy=[100, 100, 0, 100],
+                                price_sell=[15, 15, 15, 15], scu_sell_stock=[50, 500, 500, 500],
+                                scu_sell_users=[0, 0, 0, 0], max_scu=200, max_investment=800)
+    assert scores["valid"].tolist() == [True, True, False, False]
+    # Demand limited / investment limited
+    assert scores["max_buyable_scu"].tolist()[:2] == [50, 80]
+    assert scores["total_margin"].tolist()[:2] == [250, 400]
+    assert scores["profit_margin"][0] == 0.5
+
+
+def test_score_trade_routes_ignore_stocks_and_demand():
+    scores = score_trade_routes(price_buy=[10], scu_buy=[0], price_sell=[12], scu_sell_stock=[0],
+                                scu_sell_users=[0], max_scu=96, ignore_stocks=True, ignore_demand=True)
+    assert scores["valid"].tolist() == [True]
+    assert to_number(scores["max_buyable_scu"][0]) == 96
+    assert to_number(scores["investment"][0]) == 960
+
+
+def test_score_commodity_pairs_without_limits():
+    buy = [{"price_buy": 2.5, "scu_buy": 10}]
+    sell = [{"price_sell": 4, "scu_sell_stock": 30, "scu_sell_users": 25}]
+    scores = score_commodity_pairs(buy, sell, sys.maxsize, sys.maxsize)
+    assert to_number(scores["max_buyable_scu"][0]) == 5
+    assert to_number(scores["investment"][0]) == 12.5
+
+
+def test_score_commodity_pairs_negative_limits():
+    buy = [{"price_buy": 2, "scu_buy": 10}]
+    sell = [{"price_sell": 4, "scu_sell_stock": 30, "scu_sell_users": 0}]
+    assert not score_commodity_pairs(buy, sell, -1, sys.maxsize)["valid"][0]
+    assert not score_commodity_pairs(buy, sell, 10, -1)["valid"][0]
@@ -0,0 +1,31 @@
+import pytest
+from conftest import price
+from route_workers import RouteWorkerPool, compute_trade_routes, split_by_commodity
+
+BUY_COMMODITIES = [price(1, 5, price_buy=10), price(1, 6, price_buy=4), price(2, 7, price_buy=2)]
+SELL_COMMODITIES = [price(2, 5, price_sell=15), price(1, 5, price_sell=20), price(3, 6, price_sell=9)]
+
+
+def test_compute_trade_routes():
+    trade_routes = compute_trade_routes(BUY_COMMODITIES, SELL_COMMODITIES, max_scu=10)
+    assert [(route.departure, route.destination, route.total_margin) for route in trade_routes] \
+        == [("T1", "T2", 50), ("T1", "T3", 50)]
+
+
+def test_split_by_commodity_keeps_matching_sells():
+    chunks = split_by_commodity(BUY_COMMODITIES, SELL_COMMODITIES, 4)
+    assert [([buy["id_commodity"] for buy in buys], [sell["id_commodity"] for sell in sells])
+            for buys, sells in chunks] == [([5], [5, 5]), ([6], [6])]
+
+
+@pytest.mark.asyncio
+async def test_route_worker_pool_streams_results():
+    worker_pool = RouteWorkerPool(max_workers=2)
+    try:
+        chunks = split_by_commodity(BUY_COMMODITIES, SELL_COMMODITIES, 2)
+        results = [result async for result in worker_pool.map_unordered(
+            compute_trade_routes, [(buy_commodities, sell_commodities, 10) for buy_commodities, sell_commodities in chunks])]
+    finally:
+        worker_pool.shutdown()
+    assert sorted((index, [route.commodity for route in routes]) for index, routes in results) \
+        == [(0, ["C5"]), (1, ["C6"])]
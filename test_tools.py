@@ -0,0 +1,42 @@
+import asyncio
+import pytest
+from tools import discard_failures, gather_bounded
+
+
+@pytest.mark.asyncio
+async def test_gather_bounded_keeps_order_and_limit():
+    in_flight = 0
+    max_in_flight = 0
+    progress = []
+
+    async def job(value):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01 * (5 - value))
+        in_flight -= 1
+        return value * 2
+
+    results = await gather_bounded([job(i) for i in range(5)], limit=2, progress_callback=progress.append)
+    assert results == [0, 2, 4, 6, 8]
+    assert max_in_flight == 2
+    assert progress == [1, 2, 3, 4, 5]
+
+
+@pytest.mark.asyncio
+async def test_gather_bounded_partial_results():
+    progress = []
+
+    async def job(value):
+        await asyncio.sleep(0.01)
+        if value == 1:
+            raise ValueError("offline")
+        return value
+
+    with pytest.raises(ValueError):
+        await gather_bounded([job(i) for i in range(3)], limit=3)
+    results = await gather_bounded([job(i) for i in range(3)], limit=3, progress_callback=progress.append,
+                                   return_exceptions=True)
+    assert isinstance(results[1], ValueError)
+    assert discard_failures(results) == [0, 2]
+    assert progress == [1, 2, 3]
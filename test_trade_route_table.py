@@ -0,0 +1,76 @@
+import pytest
+from PyQt5.QtCore import QPoint, Qt
+from conftest import route
+from trade_route_table import ROUTE_ROLE, TradeRouteTableView
+
+FIELDS = ["departure", "commodity", "total_margin"]
+COLUMNS = ["Departure", "Commodity", "Total Margin", "Actions"]
+
+
+@pytest.fixture
+def table_view(qapp):
+    clicks = []
+    table_view = TradeRouteTableView(FIELDS, "SCU", "UEC", "Buy", "Sell",
+                                     lambda trade_route: clicks.append(("buy", trade_route.commodity)),
+                                     lambda trade_route: clicks.append(("sell", trade_route.commodity)),
+                                     placeholder="No results")
+    table_view.set_columns(COLUMNS)
+    table_view.clicks = clicks
+    yield table_view
+    table_view.deleteLater()
+
+
+def column_values(model, column):
+    return [model.index(row, column).data() for row in range(model.rowCount())]
+
+
+def test_proxy_sorts_and_limits_rows(table_view):
+    routes = [route("C1", total_margin=100), route("C2", total_margin=300), route("C3", total_margin=200)]
+    table_view.display_routes(routes, "total_margin", True, 2)
+    proxy = table_view.model()
+    assert column_values(proxy, 1) == ["C2", "C3"]
+    assert proxy.index(0, 2).data() == "300 UEC"
+    table_view.sort_routes("total_margin", False, None)
+    assert column_values(proxy, 1) == ["C1", "C3", "C2"]
+    # The source model keeps the routes in their original order
+    assert column_values(table_view.route_model, 1) == ["C1", "C2", "C3"]
+
+
+def test_proxy_maps_indexes_both_ways(table_view):
+    routes = [route("C1", total_margin=100), route("C2", total_margin=300), route("C3", total_margin=200)]
+    table_view.display_routes(routes, "total_margin", True, 2)
+    proxy = table_view.model()
+    for row in range(proxy.rowCount()):
+        proxy_index = proxy.index(row, 1)
+        source_index = proxy.mapToSource(proxy_index)
+        assert source_index.data() == proxy_index.data()
+        assert proxy.mapFromSource(source_index) == proxy_index
+    assert proxy.mapToSource(proxy.index(0, 0)).row() == 1
+    # Routes past the row limit have no index in the proxy
+    assert not proxy.mapFromSource(table_view.route_model.index(0, 0)).isValid()
+
+
+def test_placeholder_row_when_no_results(table_view):
+    table_view.display_routes([], "total_margin", True, 10, show_placeholder=True)
+    proxy = table_view.model()
+    assert proxy.rowCount() == 1
+    assert proxy.index(0, 0).data() == "No results"
+    assert proxy.index(0, 1).data() is None
+    assert proxy.index(0, 3).data(ROUTE_ROLE) is None
+    table_view.clear_routes()
+    assert proxy.rowCount() == 0
+
+
+def test_actions_delegate_dispatches_clicks(table_view, qtbot):
+    table_view.resize(800, 300)
+    table_view.show()
+    qtbot.waitExposed(table_view)
+    table_view.display_routes([route("C1", total_margin=100), route("C2", total_margin=300)], "total_margin", True, 10)
+    rect = table_view.visualRect(table_view.model().index(0, 3))
+    # The buy button fills the left half of the actions cell, the sell button the right half
+    qtbot.mouseClick(table_view.viewport(), Qt.LeftButton, pos=QPoint(rect.left() + rect.width() // 4, rect.center().y()))
+    qtbot.mouseClick(table_view.viewport(), Qt.LeftButton, pos=QPoint(rect.right() - rect.width() // 4, rect.center().y()))
+    assert table_view.clicks == [("buy", "C2"), ("sell", "C2")]
+    table_view.set_actions_enabled(False)
+    qtbot.mouseClick(table_view.viewport(), Qt.LeftButton, pos=QPoint(rect.left() + rect.width() // 4, rect.center().y()))
+    assert len(table_view.clicks) == 2
@@ -0,0 +1,138 @@
+import asyncio
+import io
+import json
+import aiohttp
+import pytest
+import uextrader
+from conftest import price
+from reference_data import ReferenceData
+from route_engine import RouteSearchOptions, find_trade_routes
+from uextrader import create_parser, find_planets, main, search_trade_routes, write_trade_routes
+
+SYSTEMS = [{"id": 1, "name": "Stanton", "is_available": 1}]
+PLANETS = [{"id": 10, "name": "Hurston", "id_star_system": 1, "is_available": 1},
+           {"id": 11, "name": "ArcCorp", "id_star_system": 1, "is_available": 1}]
+TERMINALS = [{"id": 100, "id_star_system": 1, "id_planet": 10, "city_name": "Lorville", "space_station_name": None},
+             {"id": 110, "id_star_system": 1, "id_planet": 11, "city_name": None, "space_station_name": "Station"}]
+
+
+def terminal_price(id_terminal, id_commodity, **prices):
+    # Prices carry the location of their terminal
+    terminal = next(terminal for terminal in TERMINALS if terminal["id"] == id_terminal)
+    return price(id_terminal, id_commodity, id_planet=terminal["id_planet"], city_name=terminal["city_name"],
+                 space_station_name=terminal["space_station_name"], **prices)
+
+
+PRICES = [terminal_price(100, 5, price_buy=10), terminal_price(110, 5, price_sell=15),
+          terminal_price(110, 7, price_buy=20), terminal_price(100, 7, price_sell=30)]
+
+
+class FakeAPI:
+    async def fetch_reference_data(self):
+        return ReferenceData(SYSTEMS, PLANETS, TERMINALS)
+
+    async def fetch_planets(self, system_id=None, planet_id=None):
+        return [planet for planet in PLANETS if not planet_id or planet["id"] == planet_id]
+
+    async def fetch_systems_from_origin_system(self, origin_system_id, max_bounce=1):
+        return SYSTEMS
+
+    async def fetch_terminals(self, system_id, planet_id=None, terminal_id=None):
+        return [terminal for terminal in TERMINALS if terminal["id_planet"] == planet_id]
+
+    async def fetch_commodities_from_terminal(self, id_terminal):
+        return [price for price in PRICES if price["id_terminal"] == id_terminal]
+
+    async def fetch_commodities_by_id(self, id_commodity):
+        return [price for price in PRICES if price["id_commodity"] == id_commodity]
+
+
+@pytest.mark.asyncio
+async def test_search_trade_routes():
+    args = create_parser().parse_args(["search", "--from", "stanton", "--max-scu", "10",
+                                       "--max-concurrent-requests", "2"])
+    trade_routes = await search_trade_routes(FakeAPI(), args)
+    assert [(route.departure, route.destination, route.total_margin) for route in trade_routes] \
+        == [("T110", "T100", 100), ("T100", "T110", 50)]
+
+    args = create_parser().parse_args(["search", "--from", "1", "--from-planet", "Hurston", "--max-scu", "10",
+                                       "--space-only", "--max-concurrent-requests", "2"])
+    assert await search_trade_routes(FakeAPI(), args) == []
+
+
+@pytest.mark.asyncio
+async def test_find_trade_routes_reports_progress():
+    api = FakeAPI()
+    steps, progress, chunks = [], [], []
+
+    async def collect(trade_routes):
+        chunks.append(len(trade_routes))
+
+    trade_routes = await find_trade_routes(api, PLANETS, PLANETS, RouteSearchOptions(max_scu=10),
+                                           api.fetch_commodities_from_terminal, api.fetch_commodities_by_id,
+                                           step_callback=steps.append, progress_callback=progress.append,
+                                           trade_routes_callback=collect)
+    assert sorted(route.total_margin for route in trade_routes) == [50, 100]
+    # Terminals of 2 planets, prices of 2 terminals and 2 commodities, then one chunk per commodity
+    assert steps == [2, 2, 2, 2]
+    assert progress == [1, 2, 1, 2, 1, 2, 1, 2]
+    assert sorted(chunks) == [1, 1]
+
+
+@pytest.mark.asyncio
+async def test_find_trade_routes_reports_failed_price_requests():
+    api = FakeAPI()
+    failures = []
+
+    async def fetch_commodity_prices(id_commodity):
+        if id_commodity == 5:
+            raise aiohttp.ClientConnectionError("Connection reset")
+        return await api.fetch_commodities_by_id(id_commodity)
+
+    trade_routes = await find_trade_routes(api, PLANETS, PLANETS, RouteSearchOptions(max_scu=10),
+                                           api.fetch_commodities_from_terminal, fetch_commodity_prices,
+                                           failures_callback=failures.append)
+    assert [route.commodity for route in trade_routes] == ["C7"]
+    assert failures == [1]
+
+
+@pytest.mark.asyncio
+async def test_search_trade_routes_unknown_system():
+    args = create_parser().parse_args(["search", "--from", "Pyro"])
+    with pytest.raises(ValueError):
+        await search_trade_routes(FakeAPI(), args)
+
+
+@pytest.mark.asyncio
+async def test_find_planets_destination_planet_in_any_system():
+    systems = SYSTEMS + [{"id": 2, "name": "Pyro", "is_available": 1}]
+    reference_data = ReferenceData(systems, PLANETS + [{"id": 20, "name": "Pyro I", "id_star_system": 2}], TERMINALS)
+    api = FakeAPI()
+    api.fetch_systems_from_origin_system = lambda origin_system_id, max_bounce=1: asyncio.sleep(0, systems)
+    args = create_parser().parse_args(["search", "--from", "Stanton", "--to-planet", "ArcCorp"])
+    _, destination_planets = await find_planets(api, reference_data, args)
+    assert [planet["id"] for planet in destination_planets] == [11]
+    args = create_parser().parse_args(["search", "--from", "Stanton", "--to-planet", "Daymar"])
+    with pytest.raises(ValueError):
+        await find_planets(api, reference_data, args)
+
+
+def test_main_reports_network_errors(monkeypatch):
+    async def run(args):
+        raise aiohttp.ClientConnectionError("Connection refused")
+
+    monkeypatch.setattr(uextrader, "run", run)
+    assert main(["search", "--from", "Stanton"]) == 1
+
+
+@pytest.mark.asyncio
+async def test_write_trade_routes():
+    args = create_parser().parse_args(["search", "--from", "Stanton", "--max-scu", "10", "--limit", "1",
+                                       "--max-concurrent-requests", "2"])
+    trade_routes = await search_trade_routes(FakeAPI(), args)
+    output = io.StringIO()
+    write_trade_routes(trade_routes, "json", output)
+    assert json.loads(output.getvalue())[0]["commodity"] == "C7"
+    output = io.StringIO()
+    write_trade_routes(trade_routes, "csv", output)
+    assert output.getvalue().splitlines()[1] == "T110,T100,C7,10,20,30,200,10,100,100,100,0.5,1"
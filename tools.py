@@ -6,3 +6,33 @@ def create_async_callback(async_func, *args, **kwargs):
     def wrapper():
         asyncio.create_task(async_func(*args, **kwargs))
     return wrapper
+
+
+async def gather_bounded(coroutines, limit=10, progress_callback=None, return_exceptions=False):
+    """Run coroutines with at most `limit` in flight, returning results in input order.
+
+    With `return_exceptions`, failures are returned in place of their results instead of aborting the others.
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+    completed = 0
+
+    async def run(coroutine):
+        nonlocal completed
+        try:
+            async with semaphore:
+                return await coroutine
+        finally:
+            completed += 1
+            if progress_callback:
+                progress_callback(completed)
+
+    return await asyncio.gather(*[run(coroutine) for coroutine in coroutines], return_exceptions=return_exceptions)
+
+
+def discard_failures(results, logger=None):
+    """Drop the failures returned by gather_bounded(..., return_exceptions=True), keeping the partial results."""
+    failures = [result for result in results if isinstance(result, BaseException)]
+    if failures and logger:
+        logger.warning(f"{len(failures)} of {len(results)} requests failed, continuing with partial results "
+                       f"(first error: {failures[0]!r})")
+    return [result for result in results if not isinstance(result, BaseException)]
@@ -0,0 +1,290 @@
+from dataclasses import dataclass
+
+SCU_FIELDS = ("buy_scu", "departure_scu_available", "arrival_demand_scu")
+UEC_FIELDS = ("buy_price", "sell_price", "investment", "unit_margin", "total_margin")
+
+
+def round_price(value):
+    value = round(value, 2)
+    return int(value) if value.is_integer() else value
+
+
+@dataclass(slots=True)
+class TradeRoute:
+    departure: str
+    destination: str
+    commodity: str
+    buy_scu: int
+    buy_price: float
+    sell_price: float
+    investment: float
+    unit_margin: float
+    total_margin: float
+    departure_scu_available: int
+    arrival_demand_scu: int
+    profit_margin: float
+    departure_terminal_id: int = None
+    arrival_terminal_id: int = None
+    departure_system_id: int = None
+    arrival_system_id: int = None
+    departure_planet_id: int = None
+    arrival_planet_id: int = None
+    commodity_id: int = None
+    buy_latest_update: int = 0
+    sell_latest_update: int = 0
+    arrival_terminal_mcs: int = None
+
+    @property
+    def max_buyable_scu(self):
+        return self.buy_scu
+
+    @property
+    def oldest_update(self):
+        return min(self.buy_latest_update, self.sell_latest_update)
+
+    @property
+    def latest_update(self):
+        return max(self.buy_latest_update, self.sell_latest_update)
+
+
+@dataclass(slots=True)
+class TradeChain:
+    """Consecutive trade routes, each one departing from the arrival terminal of the previous one."""
+    legs: tuple
+
+    @property
+    def trade_routes(self):
+        return self.legs
+
+    def extend(self, leg):
+        return TradeChain(self.legs + (leg,))
+
+    def uses(self, leg):
+        return any(chain_leg.departure_terminal_id == leg.departure_terminal_id
+                   and chain_leg.arrival_terminal_id == leg.arrival_terminal_id for chain_leg in self.legs)
+
+    @property
+    def departure(self):
+        return self.legs[0].departure
+
+    @property
+    def destination(self):
+        return " > ".join(leg.destination for leg in self.legs)
+
+    @property
+    def commodity(self):
+        return " > ".join(leg.commodity for leg in self.legs)
+
+    @property
+    def buy_scu(self):
+        return self.legs[0].buy_scu
+
+    @property
+    def max_buyable_scu(self):
+        return self.legs[0].buy_scu
+
+    @property
+    def buy_price(self):
+        return self.legs[0].buy_price
+
+    @property
+    def sell_price(self):
+        return self.legs[-1].sell_price
+
+    @property
+    def investment(self):
+        # Later legs can be paid with the sales of the previous ones, but never need more than the largest leg
+        return max(leg.investment for leg in self.legs)
+
+    @property
+    def unit_margin(self):
+        return sum(leg.unit_margin for leg in self.legs)
+
+    @property
+    def total_margin(self):
+        return sum(leg.total_margin for leg in self.legs)
+
+    @property
+    def profit_margin(self):
+        return self.total_margin / self.investment if self.investment else 0
+
+    @property
+    def departure_scu_available(self):
+        return self.legs[0].departure_scu_available
+
+    @property
+    def arrival_demand_scu(self):
+        return self.legs[-1].arrival_demand_scu
+
+    @property
+    def departure_terminal_id(self):
+        return self.legs[0].departure_terminal_id
+
+    @property
+    def arrival_terminal_id(self):
+        return self.legs[-1].arrival_terminal_id
+
+    @property
+    def departure_system_id(self):
+        return self.legs[0].departure_system_id
+
+    @property
+    def arrival_system_id(self):
+        return self.legs[-1].arrival_system_id
+
+    @property
+    def departure_planet_id(self):
+        return self.legs[0].departure_planet_id
+
+    @property
+    def arrival_planet_id(self):
+        return self.legs[-1].arrival_planet_id
+
+    @property
+    def commodity_id(self):
+        return self.legs[0].commodity_id
+
+    @property
+    def arrival_terminal_mcs(self):
+        return self.legs[-1].arrival_terminal_mcs
+
+    @property
+    def buy_latest_update(self):
+        return self.legs[0].buy_latest_update
+
+    @property
+    def sell_latest_update(self):
+        return self.legs[-1].sell_latest_update
+
+    @property
+    def oldest_update(self):
+        return min(leg.oldest_update for leg in self.legs)
+
+    @property
+    def latest_update(self):
+        return max(leg.latest_update for leg in self.legs)
+
+
+@dataclass(slots=True)
+class CargoMix:
+    """Several commodities bought at the same departure and sold at the same destination, as (route, scu) pairs."""
+    allocations: tuple
+
+    @property
+    def trade_routes(self):
+        return tuple(route for route, _ in self.allocations)
+
+    @property
+    def departure(self):
+        return self.allocations[0][0].departure
+
+    @property
+    def destination(self):
+        return self.allocations[0][0].destination
+
+    @property
+    def commodity(self):
+        return " + ".join(f"{route.commodity} ({scu})" for route, scu in self.allocations)
+
+    @property
+    def buy_scu(self):
+        return sum(scu for _, scu in self.allocations)
+
+    @property
+    def max_buyable_scu(self):
+        return self.allocations[0][1]
+
+    @property
+    def buy_price(self):
+        return round_price(self.investment / self.buy_scu)
+
+    @property
+    def sell_price(self):
+        return round_price((self.investment + self.total_margin) / self.buy_scu)
+
+    @property
+    def investment(self):
+        return sum(route.buy_price * scu for route, scu in self.allocations)
+
+    @property
+    def unit_margin(self):
+        return round_price(self.total_margin / self.buy_scu)
+
+    @property
+    def total_margin(self):
+        return sum(route.unit_margin * scu for route, scu in self.allocations)
+
+    @property
+    def profit_margin(self):
+        return self.total_margin / self.investment if self.investment else 0
+
+    @property
+    def departure_scu_available(self):
+        return sum(route.departure_scu_available for route, _ in self.allocations)
+
+    @property
+    def arrival_demand_scu(self):
+        return sum(route.arrival_demand_scu for route, _ in self.allocations)
+
+    @property
+    def departure_terminal_id(self):
+        return self.allocations[0][0].departure_terminal_id
+
+    @property
+    def arrival_terminal_id(self):
+        return self.allocations[0][0].arrival_terminal_id
+
+    @property
+    def departure_system_id(self):
+        return self.allocations[0][0].departure_system_id
+
+    @property
+    def arrival_system_id(self):
+        return self.allocations[0][0].arrival_system_id
+
+    @property
+    def departure_planet_id(self):
+        return self.allocations[0][0].departure_planet_id
+
+    @property
+    def arrival_planet_id(self):
+        return self.allocations[0][0].arrival_planet_id
+
+    @property
+    def commodity_id(self):
+        return self.allocations[0][0].commodity_id
+
+    @property
+    def arrival_terminal_mcs(self):
+        return self.allocations[0][0].arrival_terminal_mcs
+
+    @property
+    def buy_latest_update(self):
+        return max(route.buy_latest_update for route, _ in self.allocations)
+
+    @property
+    def sell_latest_update(self):
+        return max(route.sell_latest_update for route, _ in self.allocations)
+
+    @property
+    def oldest_update(self):
+        return min(route.oldest_update for route, _ in self.allocations)
+
+    @property
+    def latest_update(self):
+        return max(route.latest_update for route, _ in self.allocations)
+
+
+def format_trade_route_field(route, field, scu_label, uec_label):
+    value = getattr(route, field)
+    if field in SCU_FIELDS:
+        return f"{value} {scu_label}"
+    if field in UEC_FIELDS:
+        return f"{value} {uec_label}"
+    if field == "profit_margin":
+        return f"{round(value * 100)} %"
+    return str(value)
+
+
+def format_trade_route(route, fields, scu_label, uec_label):
+    return [format_trade_route_field(route, field, scu_label, uec_label) for field in fields]
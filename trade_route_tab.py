@@ -2,23 +2,26 @@ import logging
 import sys
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QLineEdit, QComboBox
 from PyQt5.QtWidgets import (
-    QPushButton, QTableWidget,
-    QMessageBox, QTableWidgetItem,
-    QHBoxLayout, QCheckBox,
-    QProgressBar
+    QPushButton, QMessageBox,
+    QCheckBox, QProgressBar
 )
-from PyQt5.QtCore import Qt
 import asyncio
-from api import API
+from api import API, RequestPriority, with_request_priority
 from config_manager import ConfigManager
 from trade_tab import TradeTab
 from translation_manager import TranslationManager
-from tools import create_async_callback
+from route_engine import RouteSearchOptions, calculate_trade_route_details, filter_arrival_commodities
+from price_snapshot_mixin import PriceSnapshotMixin
+from trade_route_table import TradeRouteTableView
 
 
-class TradeRouteTab(QWidget):
+class TradeRouteTab(QWidget, PriceSnapshotMixin):
     _lock = asyncio.Lock()
     _initialized = asyncio.Event()
+    route_fields = [
+        "destination", "commodity", "buy_scu", "buy_price", "sell_price", "investment", "unit_margin",
+        "total_margin", "departure_scu_available", "arrival_demand_scu", "profit_margin", "arrival_terminal_mcs"
+    ]
 
     def __init__(self, main_widget):
         super().__init__()
@@ -30,6 +33,9 @@ class TradeRouteTab(QWidget):
         self.logger = logging.getLogger(__name__)
         self.terminals = []
         self.current_trades = []
+        self.price_snapshot = None
+        self.search_options = None
+        self.reference_data = None
         asyncio.ensure_future(self.load_systems())
 
     async def initialize(self):
@@ -145,6 +151,7 @@ class TradeRouteTab(QWidget):
         self.filter_space_only_checkbox = QCheckBox(self.translation_manager.get_translation("space_only",
                                                                                              self.config_manager.get_lang()))
         layout.addWidget(self.filter_space_only_checkbox)
+        self.add_price_snapshot_widgets(layout)
 
         self.find_route_button = QPushButton(self.translation_manager.get_translation("find_trade_route",
                                                                                       self.config_manager.get_lang()))
@@ -251,7 +258,16 @@ class TradeRouteTab(QWidget):
         )
         layout.addWidget(self.sorting_order_combo)
 
-        self.trade_route_table = QTableWidget()
+        self.trade_route_table = TradeRouteTableView(
+            self.route_fields,
+            self.translation_manager.get_translation("scu", self.config_manager.get_lang()),
+            self.translation_manager.get_translation("uec", self.config_manager.get_lang()),
+            self.translation_manager.get_translation("select_to_buy", self.config_manager.get_lang()),
+            self.translation_manager.get_translation("select_to_sell", self.config_manager.get_lang()),
+            lambda trade_route: asyncio.ensure_future(self.select_to_buy(trade_route)),
+            lambda trade_route: asyncio.ensure_future(self.select_to_sell(trade_route)),
+            placeholder=self.translation_manager.get_translation("no_results_found", self.config_manager.get_lang())
+        )
         layout.addWidget(self.trade_route_table)
         self.setLayout(layout)
         self.define_columns()
@@ -259,8 +275,8 @@ class TradeRouteTab(QWidget):
     async def load_systems(self):
         try:
             await self.ensure_initialized()
-            systems = await self.api.fetch_data("/star_systems")
-            for system in systems.get("data", []):
+            reference_data = await self.api.fetch_reference_data()
+            for system in reference_data.get_systems():
                 if system.get("is_available") == 1:
                     self.departure_system_combo.addItem(system["name"], system["id"])
             logging.info("Systems loaded successfully.")
@@ -282,8 +298,8 @@ class TradeRouteTab(QWidget):
         if not system_id:
             return
         try:
-            planets = await self.api.fetch_data("/planets", params={'id_star_system': system_id})
-            for planet in planets.get("data", []):
+            reference_data = await self.api.fetch_reference_data()
+            for planet in reference_data.get_planets(system_id):
                 self.departure_planet_combo.addItem(planet["name"], planet["id"])
             logging.info("Planets loaded successfully.")
         except Exception as e:
@@ -303,8 +319,8 @@ class TradeRouteTab(QWidget):
         if not planet_id:
             return
         try:
-            terminals = await self.api.fetch_data("/terminals", params={'id_planet': planet_id})
-            self.terminals = [terminal for terminal in terminals.get("data", [])
+            reference_data = await self.api.fetch_reference_data()
+            self.terminals = [terminal for terminal in reference_data.get_terminals(planet_id=planet_id)
                               if terminal.get("type") == "commodity" and terminal.get("is_available") == 1]
             self.filter_terminals()
             logging.info("Terminals loaded successfully.")
@@ -318,7 +334,9 @@ class TradeRouteTab(QWidget):
 
     async def update_page_items(self):
         await self.ensure_initialized()
-        await self.update_trade_route_table(self.current_trades, self.columns, quick=False)
+        self.trade_route_table.sort_routes(self.sorting_options_combo.currentData(),
+                                           self.sorting_order_combo.currentData() == "DESC",
+                                           self.page_items_combo.currentData())
 
     def filter_terminals(self):
         filter_text = self.terminal_filter_input.text().lower()
@@ -343,13 +361,14 @@ class TradeRouteTab(QWidget):
             self.translation_manager.get_translation("trade_columns_arrival_terminal_mcs", self.config_manager.get_lang()),
             self.translation_manager.get_translation("trade_columns_actions", self.config_manager.get_lang())
         ]
-        self.trade_route_table.setColumnCount(len(self.columns))
-        self.trade_route_table.setHorizontalHeaderLabels(self.columns)
+        self.trade_route_table.set_columns(self.columns)
 
+    @with_request_priority(RequestPriority.SEARCH)
     async def find_trade_routes(self):
         await self.ensure_initialized()
         self.logger.log(logging.INFO, "Searching for a new Trade Route")
-        self.trade_route_table.setRowCount(0)  # Clear previous results
+        self.trade_route_table.clear_routes()  # Clear previous results
+        self.reset_search_state()
 
         await self.main_widget.set_gui_enabled(False)
         self.main_progress_bar.setVisible(True)
@@ -366,11 +385,15 @@ class TradeRouteTab(QWidget):
                                                                              self.config_manager.get_lang()))
                 return
 
+            self.reference_data = await self.api.fetch_reference_data()
+            self.search_options = self.get_search_options(max_scu, max_investment)
+            await self.load_price_snapshot()
             self.current_trades = await self.fetch_and_process_departure_commodities(
-                departure_terminal_id, max_scu, max_investment, departure_system_id, departure_planet_id
+                departure_terminal_id, self.search_options, departure_system_id, departure_planet_id
             )
 
-            await self.update_trade_route_table(self.current_trades, self.columns, quick=False)
+            await self.display_trade_routes(self.current_trades, self.columns, quick=False)
+            self.warn_failed_price_requests()
         except Exception as e:
             self.logger.log(logging.ERROR, f"An error occurred while finding trade routes: {e}")
             QMessageBox.critical(self, self.translation_manager.get_translation("error_error",
@@ -391,69 +414,76 @@ class TradeRouteTab(QWidget):
         departure_terminal_id = self.departure_terminal_combo.currentData()
         return max_scu, max_investment, departure_system_id, departure_planet_id, departure_terminal_id
 
+    def get_search_options(self, max_scu, max_investment):
+        # Widgets are read once per search, the route engine only sees plain values
+        return RouteSearchOptions(
+            max_scu=max_scu,
+            max_investment=max_investment,
+            ignore_stocks=self.ignore_stocks_checkbox.isChecked(),
+            ignore_demand=self.ignore_demand_checkbox.isChecked(),
+            filter_public_hangars=self.filter_public_hangars_checkbox.isChecked(),
+            filter_space_only=self.filter_space_only_checkbox.isChecked(),
+            filter_system=self.filter_system_checkbox.isChecked(),
+            filter_planet=self.filter_planet_checkbox.isChecked()
+        )
+
     async def fetch_and_process_departure_commodities(
-        self, departure_terminal_id, max_scu, max_investment, departure_system_id, departure_planet_id
+        self, departure_terminal_id, search_options, departure_system_id, departure_planet_id
     ):
         await self.ensure_initialized()
         trade_routes = []
-        departure_commodities = await self.api.fetch_data(
-            "/commodities_prices", params={'id_terminal': departure_terminal_id}
-        )
+        departure_commodities = await self.fetch_terminal_prices(departure_terminal_id)
         self.logger.log(
             logging.INFO,
-            f"Iterating through {len(departure_commodities.get('data', []))} commodities at departure terminal"
+            f"Iterating through {len(departure_commodities)} commodities at departure terminal"
         )
-        universe = len(departure_commodities.get("data", []))
+        universe = len(departure_commodities)
         self.main_progress_bar.setMaximum(universe)
         actionProgress = 0
-        for departure_commodity in departure_commodities.get("data", []):
+        for departure_commodity in departure_commodities:
             self.main_progress_bar.setValue(actionProgress)
             actionProgress += 1
             if departure_commodity.get("price_buy") == 0:
                 continue
-            arrival_commodities = await self.api.fetch_data(
-                "/commodities_prices",
-                params={'id_commodity': departure_commodity.get("id_commodity")}
-            )
+            try:
+                arrival_commodities = await self.fetch_commodity_prices(departure_commodity.get("id_commodity"))
+            except Exception as e:
+                # Partial results: the other commodities of the terminal are still searched
+                if not self.config_manager.get_partial_results():
+                    raise
+                self.logger.log(logging.WARNING, f"Skipping {departure_commodity.get('commodity_name')}: {e!r}")
+                self.add_failed_price_requests(1)
+                continue
             self.logger.log(
                 logging.INFO,
-                f"Found {len(arrival_commodities.get('data', []))} terminals that might sell "
+                f"Found {len(arrival_commodities)} terminals that might sell "
                 f"{departure_commodity.get('commodity_name')}"
             )
             trade_routes.extend(await self.process_arrival_commodities(
-                arrival_commodities, departure_commodity, max_scu, max_investment, departure_system_id,
+                arrival_commodities, departure_commodity, search_options, departure_system_id,
                 departure_planet_id, departure_terminal_id
             ))
-            await self.update_trade_route_table(trade_routes, self.columns)
+            await self.display_trade_routes(trade_routes, self.columns)
         self.main_progress_bar.setValue(actionProgress)
         return trade_routes
 
     async def process_arrival_commodities(
-        self, arrival_commodities, departure_commodity, max_scu, max_investment, departure_system_id,
+        self, arrival_commodities, departure_commodity, search_options, departure_system_id,
         departure_planet_id, departure_terminal_id
     ):
         await self.ensure_initialized()
-        arrival_commodities = arrival_commodities.get("data", [])
         trade_routes = []
+        arrival_commodities = filter_arrival_commodities(arrival_commodities, departure_system_id, departure_planet_id,
+                                                         departure_terminal_id, search_options)
         universe = len(arrival_commodities)
         self.progress_bar.setMaximum(universe)
         actionProgress = 0
         for arrival_commodity in arrival_commodities:
             self.progress_bar.setValue(actionProgress)
             actionProgress += 1
-            if arrival_commodity.get("is_available") == 0 or arrival_commodity.get("id_terminal") == departure_terminal_id:
-                continue
-            if self.filter_system_checkbox.isChecked() and arrival_commodity.get("id_star_system") != departure_system_id:
-                continue
-            if self.filter_planet_checkbox.isChecked() and arrival_commodity.get("id_planet") != departure_planet_id:
-                continue
-            if self.filter_public_hangars_checkbox.isChecked() and (not arrival_commodity["city_name"]
-                                                                    and not arrival_commodity["space_station_name"]):
-                continue
-            if self.filter_space_only_checkbox.isChecked() and not arrival_commodity["space_station_name"]:
-                continue
-            trade_route = await self.calculate_trade_route_details(
-                arrival_commodity, departure_commodity, max_scu, max_investment, departure_system_id,
+            # Names and mcs are resolved from the reference data loaded once for the whole search
+            trade_route = calculate_trade_route_details(
+                arrival_commodity, departure_commodity, search_options, self.reference_data, departure_system_id,
                 departure_planet_id, departure_terminal_id
             )
             if trade_route:
@@ -461,117 +491,13 @@ class TradeRouteTab(QWidget):
         self.progress_bar.setValue(actionProgress)
         return trade_routes
 
-    async def calculate_trade_route_details(
-        self, arrival_commodity, departure_commodity, max_scu, max_investment, departure_system_id,
-        departure_planet_id, departure_terminal_id
-    ):
-        await self.ensure_initialized()
-        buy_price = departure_commodity.get("price_buy", 0)
-        available_scu = departure_commodity.get("scu_buy", 0)
-        original_available_scu = available_scu  # Store original available SCU
-        scu_sell_stock = arrival_commodity.get("scu_sell_stock", 0)
-        scu_sell_users = arrival_commodity.get("scu_sell_users", 0)
-        sell_price = arrival_commodity.get("price_sell", 0)
-        demand_scu = scu_sell_stock - scu_sell_users
-        original_demand_scu = demand_scu  # Store original demand SCU
-        if self.ignore_stocks_checkbox.isChecked():
-            available_scu = max_scu
-        if self.ignore_demand_checkbox.isChecked():
-            demand_scu = max_scu
-        if not buy_price or not sell_price or available_scu <= 0 or not demand_scu:
-            return None
-        max_buyable_scu = min(max_scu, available_scu, int(max_investment // buy_price), demand_scu)
-        if max_buyable_scu <= 0:
-            return None
-        investment = buy_price * max_buyable_scu
-        unit_margin = (sell_price - buy_price)
-        total_margin = unit_margin * max_buyable_scu
-        profit_margin = unit_margin / buy_price
-        arrival_terminal = await self.api.fetch_data("/terminals", params={'id': arrival_commodity.get("id_terminal")})
-        arrival_terminal_mcs = arrival_terminal.get("data")[0].get("mcs")
-        arrival_id_star_system = arrival_commodity.get("id_star_system")
-        destination = next(
-            (system["name"] for system in (await self.api.fetch_data("/star_systems")).get("data", [])
-             if system["id"] == arrival_id_star_system),
-            "Unknown System"
-        ) + " - " + next(
-            (planet["name"] for planet in (await self.api.fetch_data(
-                "/planets", params={'id_star_system': arrival_id_star_system}
-            )).get("data", [])
-             if planet["id"] == arrival_commodity.get("id_planet")),
-            "Unknown Planet"
-        ) + " / " + arrival_commodity.get("terminal_name")
-        departure_modified = departure_commodity["date_modified"]
-        arrival_modified = arrival_commodity["date_modified"]
-        return {
-            "destination": destination,
-            "commodity": departure_commodity.get("commodity_name"),
-            "buy_scu": str(max_buyable_scu) + " "
-            + self.translation_manager.get_translation("scu", self.config_manager.get_lang()),
-            "buy_price": str(buy_price) + " "
-            + self.translation_manager.get_translation("uec", self.config_manager.get_lang()),
-            "sell_price": str(sell_price) + " "
-            + self.translation_manager.get_translation("uec", self.config_manager.get_lang()),
-            "investment": str(investment) + " "
-            + self.translation_manager.get_translation("uec", self.config_manager.get_lang()),
-            "unit_margin": str(unit_margin) + " "
-            + self.translation_manager.get_translation("uec", self.config_manager.get_lang()),
-            "total_margin": str(total_margin) + " "
-            + self.translation_manager.get_translation("uec", self.config_manager.get_lang()),
-            "departure_scu_available": str(original_available_scu) + " "
-            + self.translation_manager.get_translation("scu", self.config_manager.get_lang()),  # Show original available SCU
-            "arrival_demand_scu": str(original_demand_scu) + " "
-            + self.translation_manager.get_translation("scu", self.config_manager.get_lang()),  # Show original demand SCU
-            "profit_margin": str(round(profit_margin * 100)) + " %",
-            "arrival_terminal_mcs": arrival_terminal_mcs,
-            "departure_system_id": departure_system_id,
-            "departure_planet_id": departure_planet_id,
-            "departure_terminal_id": departure_terminal_id,
-            "arrival_system_id": arrival_commodity.get("id_star_system"),
-            "arrival_planet_id": arrival_commodity.get("id_planet"),
-            "arrival_terminal_id": arrival_commodity.get("id_terminal"),
-            "commodity_id": departure_commodity.get("id_commodity"),
-            "max_buyable_scu": max_buyable_scu,
-            "buy_latest_update": str(departure_commodity["date_modified"]),
-            "sell_latest_update": str(departure_commodity["date_modified"]),
-            "oldest_update": str(departure_modified) if departure_modified < arrival_modified else str(arrival_modified),
-            "latest_update": str(departure_modified) if departure_modified > arrival_modified else str(arrival_modified)
-        }
-
-    async def update_trade_route_table(self, trade_routes, columns, quick=True):
+    async def display_trade_routes(self, trade_routes, columns, quick=True):
         await self.ensure_initialized()
-        sorting_formula = self.sorting_options_combo.currentData()
-        reverse_order = True if self.sorting_order_combo.currentData() == "DESC" else False
-        nb_items = 5 if quick else self.page_items_combo.currentData()
-        trade_routes.sort(key=lambda x: float(x[sorting_formula].split()[0]), reverse=reverse_order)
-        self.trade_route_table.setRowCount(0)  # Clear the table before adding sorted results
-        for i, route in enumerate(trade_routes[:nb_items]):
-            self.trade_route_table.insertRow(i)
-            for j, value in enumerate(route.values()):
-                if j < len(columns) - 1:
-                    item = QTableWidgetItem(str(value))
-                    item.setFlags(item.flags() & ~Qt.ItemIsEditable)  # Make the item non-editable
-                    self.trade_route_table.setItem(i, j, item)
-                else:
-                    action_layout = QHBoxLayout()
-                    buy_button = QPushButton(self.translation_manager.get_translation("select_to_buy",
-                                                                                      self.config_manager.get_lang()))
-                    buy_button.clicked.connect(create_async_callback(self.select_to_buy, trade_routes[i]))
-                    sell_button = QPushButton(self.translation_manager.get_translation("select_to_sell",
-                                                                                       self.config_manager.get_lang()))
-                    sell_button.clicked.connect(create_async_callback(self.select_to_sell, trade_routes[i]))
-                    action_layout.addWidget(buy_button)
-                    action_layout.addWidget(sell_button)
-                    action_widget = QWidget()
-                    action_widget.setLayout(action_layout)
-                    self.trade_route_table.setCellWidget(i, j, action_widget)
-        if len(trade_routes) == 0:
-            self.trade_route_table.insertRow(0)
-            item = QTableWidgetItem(self.translation_manager.get_translation("no_results_found",
-                                                                             self.config_manager.get_lang()))
-            item.setFlags(item.flags() & ~Qt.ItemIsEditable)  # Make the item non-editable
-            self.trade_route_table.setItem(0, 0, item)
-        self.trade_route_table.resizeColumnsToContents()
+        self.trade_route_table.display_routes(trade_routes,
+                                              self.sorting_options_combo.currentData(),
+                                              self.sorting_order_combo.currentData() == "DESC",
+                                              5 if quick else self.page_items_combo.currentData(),
+                                              show_placeholder=True)
         self.logger.log(logging.INFO, "Finished calculating Trade routes")
 
     async def select_to_buy(self, trade_route):
@@ -600,6 +526,16 @@ class TradeRouteTab(QWidget):
                                  self.translation_manager.get_translation("error_generic",
                                                                           self.config_manager.get_lang()))
 
+    async def rescore_trade_route(self, trade_route):
+        departure_commodity = self.price_snapshot.get_price(trade_route.departure_terminal_id, trade_route.commodity_id)
+        arrival_commodity = self.price_snapshot.get_price(trade_route.arrival_terminal_id, trade_route.commodity_id)
+        if not departure_commodity or not arrival_commodity:
+            return None
+        return calculate_trade_route_details(
+            arrival_commodity, departure_commodity, self.search_options, self.reference_data,
+            trade_route.departure_system_id, trade_route.departure_planet_id, trade_route.departure_terminal_id
+        )
+
     def set_gui_enabled(self, enabled):
         for input in self.findChildren(QLineEdit):
             input.setEnabled(enabled)
@@ -609,3 +545,4 @@ class TradeRouteTab(QWidget):
             combo.setEnabled(enabled)
         for button in self.findChildren(QPushButton):
             button.setEnabled(enabled)
+        self.trade_route_table.set_actions_enabled(enabled)
@@ -0,0 +1,200 @@
+from PyQt5.QtWidgets import QTableView, QStyledItemDelegate, QStyleOptionButton, QStyle, QApplication
+from PyQt5.QtCore import Qt, QAbstractTableModel, QAbstractProxyModel, QModelIndex, QRect, QSize, QEvent
+from trade_route import format_trade_route_field
+
+ROUTE_ROLE = Qt.UserRole
+
+
+class TradeRouteTableModel(QAbstractTableModel):
+    def __init__(self, fields, scu_label, uec_label, placeholder=None, parent=None):
+        super().__init__(parent)
+        self.fields = fields
+        self.headers = []
+        self.scu_label = scu_label
+        self.uec_label = uec_label
+        self.placeholder = placeholder
+        self.show_placeholder = False
+        self.routes = []
+
+    def set_headers(self, headers):
+        self.beginResetModel()
+        self.headers = headers
+        self.endResetModel()
+
+    def set_routes(self, routes, show_placeholder=False):
+        self.beginResetModel()
+        self.routes = routes
+        self.show_placeholder = bool(show_placeholder and self.placeholder and not routes)
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.routes) or int(self.show_placeholder)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if not self.routes:
+            return self.placeholder if role == Qt.DisplayRole and index.column() == 0 else None
+        route = self.routes[index.row()]
+        if role == ROUTE_ROLE:
+            return route
+        if role == Qt.DisplayRole and index.column() < len(self.fields):
+            return format_trade_route_field(route, self.fields[index.column()], self.scu_label, self.uec_label)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal and section < len(self.headers):
+            return self.headers[section]
+        return super().headerData(section, orientation, role)
+
+    def flags(self, index):
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable  # Make the items non-editable
+
+
+class TradeRouteProxyModel(QAbstractProxyModel):
+    """Sorted view over a TradeRouteTableModel exposing only the first `row_limit` rows."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.row_limit = None
+        self.sort_field = None
+        self.descending = True
+        self.source_rows = []
+        self.proxy_rows = []
+
+    def setSourceModel(self, source_model):
+        super().setSourceModel(source_model)
+        source_model.modelAboutToBeReset.connect(self.beginResetModel)
+        source_model.modelReset.connect(self.on_source_reset)
+
+    def on_source_reset(self):
+        self.update_order()
+        self.endResetModel()
+
+    def update_order(self):
+        # Sort on the raw route values (plain Python sort), never on formatted strings
+        source_model = self.sourceModel()
+        self.source_rows = list(range(source_model.rowCount()))
+        if self.sort_field and source_model.routes:
+            routes = source_model.routes
+            self.source_rows.sort(key=lambda row: getattr(routes[row], self.sort_field), reverse=self.descending)
+        self.proxy_rows = [0] * len(self.source_rows)
+        for proxy_row, source_row in enumerate(self.source_rows):
+            self.proxy_rows[source_row] = proxy_row
+
+    def sort_routes(self, sort_field, descending, row_limit):
+        self.beginResetModel()
+        self.sort_field = sort_field
+        self.descending = descending
+        self.row_limit = row_limit
+        self.update_order()
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        if self.row_limit is None:
+            return len(self.source_rows)
+        return min(len(self.source_rows), self.row_limit)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.sourceModel().columnCount()
+
+    def index(self, row, column, parent=QModelIndex()):
+        if parent.isValid() or not self.hasIndex(row, column, parent):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=QModelIndex()):
+        return QModelIndex()
+
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid():
+            return QModelIndex()
+        return self.sourceModel().index(self.source_rows[proxy_index.row()], proxy_index.column())
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid() or source_index.row() >= len(self.proxy_rows):
+            return QModelIndex()
+        return self.index(self.proxy_rows[source_index.row()], source_index.column())
+
+
+class TradeRouteActionsDelegate(QStyledItemDelegate):
+    """Paint the buy/sell buttons of the actions column instead of creating widgets for every row."""
+
+    def __init__(self, buy_label, sell_label, on_buy, on_sell, parent=None):
+        super().__init__(parent)
+        self.labels = (buy_label, sell_label)
+        self.callbacks = (on_buy, on_sell)
+        self.enabled = True
+
+    def button_rects(self, rect):
+        half_width = rect.width() // 2
+        return (QRect(rect.left(), rect.top(), half_width, rect.height()).adjusted(2, 2, -1, -2),
+                QRect(rect.left() + half_width, rect.top(), rect.width() - half_width, rect.height()).adjusted(1, 2, -2, -2))
+
+    def paint(self, painter, option, index):
+        if index.data(ROUTE_ROLE) is None:
+            return super().paint(painter, option, index)
+        style = option.widget.style() if option.widget else QApplication.style()
+        for label, rect in zip(self.labels, self.button_rects(option.rect)):
+            button = QStyleOptionButton()
+            button.rect = rect
+            button.text = label
+            button.state = QStyle.State_Enabled if self.enabled else QStyle.State_None
+            style.drawControl(QStyle.CE_PushButton, button, painter, option.widget)
+
+    def sizeHint(self, option, index):
+        metrics = option.fontMetrics
+        width = sum(metrics.horizontalAdvance(label) for label in self.labels) + 40
+        return QSize(width, max(metrics.height() + 14, super().sizeHint(option, index).height()))
+
+    def editorEvent(self, event, model, option, index):
+        if not self.enabled or event.type() != QEvent.MouseButtonRelease or event.button() != Qt.LeftButton:
+            return False
+        route = index.data(ROUTE_ROLE)
+        if route is None:
+            return False
+        for callback, rect in zip(self.callbacks, self.button_rects(option.rect)):
+            if rect.contains(event.pos()):
+                callback(route)
+                return True
+        return False
+
+
+class TradeRouteTableView(QTableView):
+    """Virtualized view over TradeRoute records: only the visible rows are ever formatted or painted."""
+
+    def __init__(self, fields, scu_label, uec_label, buy_label, sell_label, on_buy, on_sell, placeholder=None, parent=None):
+        super().__init__(parent)
+        self.route_model = TradeRouteTableModel(fields, scu_label, uec_label, placeholder, self)
+        self.route_proxy = TradeRouteProxyModel(self)
+        self.route_proxy.setSourceModel(self.route_model)
+        self.setModel(self.route_proxy)
+        self.actions_delegate = TradeRouteActionsDelegate(buy_label, sell_label, on_buy, on_sell, self)
+        # Only measure the visible rows when resizing columns to their contents
+        self.horizontalHeader().setResizeContentsPrecision(0)
+
+    def set_columns(self, columns):
+        self.route_model.set_headers(columns)
+        self.setItemDelegateForColumn(len(columns) - 1, self.actions_delegate)
+
+    def set_actions_enabled(self, enabled):
+        self.actions_delegate.enabled = enabled
+        self.viewport().update()
+
+    def clear_routes(self):
+        self.route_model.set_routes([])
+
+    def display_routes(self, routes, sort_field, descending, row_limit, show_placeholder=False):
+        self.route_model.set_routes(routes, show_placeholder)
+        self.sort_routes(sort_field, descending, row_limit)
+
+    def sort_routes(self, sort_field, descending, row_limit):
+        self.route_proxy.sort_routes(sort_field, descending, row_limit)
+        self.resizeColumnsToContents()
@@ -136,8 +136,8 @@ class TradeTab(QWidget):
     async def load_systems(self):
         try:
             await self.ensure_initialized()
-            systems = await self.api.fetch_data("/star_systems")
-            for system in systems.get("data", []):
+            reference_data = await self.api.fetch_reference_data()
+            for system in reference_data.get_systems():
                 if system.get("is_available") == 1:
                     self.system_combo.addItem(system["name"], system["id"])
             logging.info("Systems loaded successfully.")
@@ -156,8 +156,8 @@ class TradeTab(QWidget):
         if not system_id:
             return
         try:
-            planets = await self.api.fetch_data("/planets", params={'id_star_system': system_id})
-            for planet in planets.get("data", []):
+            reference_data = await self.api.fetch_reference_data()
+            for planet in reference_data.get_planets(system_id):
                 self.planet_combo.addItem(planet["name"], planet["id"])
             logging.info(f"Planets loaded successfully for star_system ID : {system_id}")
         except Exception as e:
@@ -177,8 +177,8 @@ class TradeTab(QWidget):
         if not planet_id:
             return []
         try:
-            terminals = await self.api.fetch_data("/terminals", params={'id_planet': planet_id})
-            self.terminals = [terminal for terminal in terminals.get("data", [])
+            reference_data = await self.api.fetch_reference_data()
+            self.terminals = [terminal for terminal in reference_data.get_terminals(planet_id=planet_id)
                               if terminal.get("type") == "commodity" and terminal.get("is_available") == 1]
             self.filter_terminals()
             logging.info(f"Terminals loaded successfully for planet ID : {planet_id}")
@@ -377,16 +377,16 @@ class TradeTab(QWidget):
         self.planet_combo.blockSignals(True)
         self.terminal_combo.blockSignals(True)
 
-        system_id = trade_route["departure_system_id"] if is_buy else trade_route["arrival_system_id"]
+        system_id = trade_route.departure_system_id if is_buy else trade_route.arrival_system_id
         self.system_combo.setCurrentIndex(self.system_combo.findData(system_id))
         logger.info(f"Selected system ID: {system_id}")
         await self.update_planets()
 
-        planet_id = trade_route["departure_planet_id"] if is_buy else trade_route["arrival_planet_id"]
+        planet_id = trade_route.departure_planet_id if is_buy else trade_route.arrival_planet_id
         self.planet_combo.setCurrentIndex(self.planet_combo.findData(planet_id))
         logger.info(f"Selected planet ID: {planet_id}")
 
-        terminal_id = trade_route["departure_terminal_id"] if is_buy else trade_route["arrival_terminal_id"]
+        terminal_id = trade_route.departure_terminal_id if is_buy else trade_route.arrival_terminal_id
         terminals = await self.update_terminals()
         if terminal_id in [terminal["id"] for terminal in terminals]:
             self.filter_terminals(terminal_id)
@@ -397,7 +397,7 @@ class TradeTab(QWidget):
         await self.update_commodities()
 
         commodity_list = self.commodity_buy_list if is_buy else self.commodity_sell_list
-        commodity_id = trade_route["commodity_id"]
+        commodity_id = trade_route.commodity_id
         for i in range(commodity_list.count()):
             item = commodity_list.item(i)
             if item.data(Qt.UserRole) == commodity_id:
@@ -405,8 +405,8 @@ class TradeTab(QWidget):
                 logger.info(f"Selected commodity ID: {commodity_id}")
                 break
 
-        self.amount_input.setText(str(trade_route["max_buyable_scu"]))
-        logger.info(f"Set amount to: {trade_route['max_buyable_scu']}")
+        self.amount_input.setText(str(trade_route.max_buyable_scu))
+        logger.info(f"Set amount to: {trade_route.max_buyable_scu}")
 
         self.terminal_combo.blockSignals(False)
         self.planet_combo.blockSignals(False)
@@ -0,0 +1,182 @@
+# uextrader.py
+"""Headless entry point: search the best trade routes without the GUI.
+
+    python -m uextrader search --from Stanton --max-scu 696 --max-investment 500000 --format csv
+"""
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import multiprocessing
+import sys
+import aiohttp
+from api import API, RequestPriority, with_request_priority
+from config_manager import ConfigManager
+from route_engine import RouteSearchOptions, find_trade_routes
+from route_ranking import route_sort_key, top_routes
+from route_workers import RouteWorkerPool
+from tools import gather_bounded
+
+OUTPUT_FIELDS = (
+    "departure", "destination", "commodity", "buy_scu", "buy_price", "sell_price", "investment", "unit_margin",
+    "total_margin", "departure_scu_available", "arrival_demand_scu", "profit_margin", "oldest_update"
+)
+SORTING_OPTIONS = (
+    "total_margin", "profit_margin", "unit_margin", "investment", "buy_scu", "oldest_update", "latest_update",
+    "buy_latest_update", "sell_latest_update"
+)
+
+logger = logging.getLogger(__name__)
+
+
+def find_system(reference_data, name_or_id):
+    """Look a star system up by id or (case insensitive) name."""
+    for system in reference_data.get_systems():
+        if str(system["id"]) == name_or_id or system.get("name", "").lower() == name_or_id.lower():
+            return system
+    raise ValueError(f"Unknown star system: {name_or_id}")
+
+
+def find_planet(reference_data, system_id, name_or_id):
+    planets = find_planets_in_systems(reference_data, [system_id], name_or_id)
+    if not planets:
+        raise ValueError(f"Unknown planet: {name_or_id}")
+    return planets[0]
+
+
+def find_planets_in_systems(reference_data, system_ids, name_or_id):
+    """Planets of the given star systems with that id or (case insensitive) name."""
+    return [planet for system_id in system_ids for planet in reference_data.get_planets(system_id)
+            if str(planet["id"]) == name_or_id or planet.get("name", "").lower() == name_or_id.lower()]
+
+
+def get_search_options(args):
+    return RouteSearchOptions(
+        max_scu=args.max_scu,
+        max_investment=args.max_investment,
+        ignore_stocks=args.ignore_stocks,
+        ignore_demand=args.ignore_demand,
+        filter_public_hangars=args.public_hangars,
+        filter_space_only=args.space_only,
+        mix_commodities=args.mix
+    )
+
+
+async def find_planets(api, reference_data, args):
+    """Departure and destination planets selected by the command line arguments."""
+    departure_system = find_system(reference_data, args.departure_system)
+    departure_planet_id = find_planet(reference_data, departure_system["id"], args.departure_planet)["id"] \
+        if args.departure_planet else None
+    departure_planets = await api.fetch_planets(departure_system["id"], departure_planet_id)
+    if args.destination_system:
+        destination_systems = await api.fetch_system(find_system(reference_data, args.destination_system)["id"])
+    else:
+        destination_systems = await api.fetch_systems_from_origin_system(departure_system["id"], max_bounce=2)
+    if args.destination_planet:
+        # Without --to, the planet only has to exist in one of the destination systems
+        destination_planets = find_planets_in_systems(reference_data, [system["id"] for system in destination_systems],
+                                                      args.destination_planet)
+        if not destination_planets:
+            raise ValueError(f"Unknown planet: {args.destination_planet}")
+    else:
+        destination_planets = [planet for system_planets in await gather_bounded(
+            [api.fetch_planets(system["id"]) for system in destination_systems], limit=args.max_concurrent_requests)
+            for planet in system_planets]
+    return departure_planets, destination_planets
+
+
+def price_fetchers(api, price_snapshot=None):
+    """Terminal and commodity price lookups, from the snapshot when it is used, otherwise from /commodities_prices."""
+    if not price_snapshot:
+        return api.fetch_commodities_from_terminal, api.fetch_commodities_by_id
+
+    async def fetch_terminal_prices(terminal_id):
+        return price_snapshot.get_terminal_prices(terminal_id)
+
+    async def fetch_commodity_prices(commodity_id):
+        return price_snapshot.get_commodity_prices(commodity_id)
+    return fetch_terminal_prices, fetch_commodity_prices
+
+
+@with_request_priority(RequestPriority.SEARCH)
+async def search_trade_routes(api, args):
+    """Same search as the "Best Trade Routes" tab, driven by the command line arguments."""
+    search_options = get_search_options(args)
+    reference_data = await api.fetch_reference_data()
+    price_snapshot = await api.fetch_price_snapshot() if args.price_snapshot else None
+    departure_planets, destination_planets = await find_planets(api, reference_data, args)
+    trade_routes = await find_trade_routes(api, departure_planets, destination_planets, search_options,
+                                           *price_fetchers(api, price_snapshot), limit=args.max_concurrent_requests,
+                                           partial_results=args.partial_results)
+    return top_routes(trade_routes, args.limit, route_sort_key(args.sort), args.order == "DESC")
+
+
+def write_trade_routes(trade_routes, output_format, output):
+    rows = [{field: getattr(trade_route, field) for field in OUTPUT_FIELDS} for trade_route in trade_routes]
+    if output_format == "csv":
+        writer = csv.DictWriter(output, fieldnames=OUTPUT_FIELDS, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(rows)
+    else:
+        json.dump(rows, output, indent=2)
+        output.write("\n")
+
+
+def create_parser():
+    parser = argparse.ArgumentParser(prog="uextrader", description="UEX-Trader without the GUI")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    search = subparsers.add_parser("search", help="Search the best trade routes")
+    search.add_argument("--from", dest="departure_system", required=True, help="Departure star system (name or id)")
+    search.add_argument("--from-planet", dest="departure_planet", help="Departure planet (name or id)")
+    search.add_argument("--to", dest="destination_system", help="Destination star system (name or id)")
+    search.add_argument("--to-planet", dest="destination_planet", help="Destination planet (name or id)")
+    search.add_argument("--max-scu", type=int, default=sys.maxsize)
+    search.add_argument("--max-investment", type=float, default=sys.maxsize)
+    search.add_argument("--ignore-stocks", action="store_true")
+    search.add_argument("--ignore-demand", action="store_true")
+    search.add_argument("--public-hangars", action="store_true", help="Only terminals with a public hangar")
+    search.add_argument("--space-only", action="store_true", help="Only space station terminals")
+    search.add_argument("--mix", action="store_true", help="Mix several commodities in the cargo")
+    search.add_argument("--price-snapshot", action="store_true", help="Search against the price snapshot")
+    search.add_argument("--sort", choices=SORTING_OPTIONS, default="total_margin")
+    search.add_argument("--order", choices=("DESC", "ASC"), default="DESC")
+    search.add_argument("--limit", type=int, default=10)
+    search.add_argument("--format", dest="output_format", choices=("json", "csv"), default="json")
+    search.add_argument("--max-concurrent-requests", type=int)
+    search.add_argument("--strict", dest="partial_results", action="store_false",
+                        help="Fail the search when a price request fails instead of skipping it")
+    return parser
+
+
+async def run(args, output=sys.stdout):
+    config_manager = ConfigManager()
+    await config_manager.initialize()
+    if args.max_concurrent_requests is None:
+        args.max_concurrent_requests = config_manager.get_max_concurrent_requests()
+    api = API(config_manager)
+    await api.initialize()
+    try:
+        trade_routes = await search_trade_routes(api, args)
+    finally:
+        RouteWorkerPool().shutdown()
+        await api.cleanup()
+    write_trade_routes(trade_routes, args.output_format, output)
+
+
+def main(argv=None):
+    args = create_parser().parse_args(argv)
+    try:
+        asyncio.run(run(args))
+    except ValueError as e:
+        logger.error(e)
+        return 2
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.error(f"API request failed: {e!r}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Route computations run in spawned worker processes
+    sys.exit(main())